@@ -0,0 +1,54 @@
+"""Compares decoding and encoding of ranking and match pages with the standard library's json against the backend selected by fast_json.
+The pages are the synthetic Toornament responses of benchmarks.model_memory. Install orjson or ujson to see a difference.
+
+Usage (from the repository root): python -m benchmarks.json_backends [repetitions]
+"""
+
+import json
+import statistics
+import sys
+import time
+
+import fast_json
+from benchmarks.model_memory import match_page, ranking_page
+
+
+def measure(function, payloads, repetitions: int):
+    "Calls a function on every payload and returns the mean time per payload in microseconds for each repetition."
+
+    timings = []
+
+    for _ in range(repetitions):
+        start = time.perf_counter()
+
+        for payload in payloads:
+            function(payload)
+
+        timings += [(time.perf_counter() - start) / len(payloads) * 1e6]
+
+    return timings
+
+
+def report(name: str, stdlib_timings, fast_timings):
+    stdlib = statistics.median(stdlib_timings)
+    fast = statistics.median(fast_timings)
+    print(f"{name:<16} json {stdlib:8.1f} us | {fast_json.backend} {fast:8.1f} us | {stdlib / fast:5.2f}x")
+
+
+def main(repetitions: int = 50):
+    pages = [ranking_page(group) for group in range(20)] + [match_page(group) for group in range(20)]
+    encoded_pages = [page.encode('utf-8') for page in pages]
+    decoded_pages = [json.loads(page) for page in pages]
+
+    print(f"Backend: {fast_json.backend}, {len(pages)} pages of {statistics.mean(len(page) for page in encoded_pages) / 1024:.1f} KiB on average")
+
+    report("decode", measure(json.loads, encoded_pages, repetitions), measure(fast_json.loads, encoded_pages, repetitions))
+    report("encode", measure(lambda page: json.dumps(page, indent = 2), decoded_pages, repetitions), measure(fast_json.dumps, decoded_pages, repetitions))
+
+    stdlib_size = sum(len(json.dumps(page, indent = 2)) for page in decoded_pages)
+    compact_size = sum(len(fast_json.dumps(page)) for page in decoded_pages)
+    print(f"Storage size: {stdlib_size / 1024:.1f} KiB indented | {compact_size / 1024:.1f} KiB compact")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
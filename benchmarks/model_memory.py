@@ -0,0 +1,110 @@
+"""Compares the memory retained by ranking items and matches kept as decoded JSON dictionaries against the compact models.
+The responses are synthetic, but have the same shape (and the same unused fields) as the ones of the Toornament viewer API.
+
+Usage (from the repository root): python -m benchmarks.model_memory [groups]
+"""
+
+import gc
+import json
+import sys
+import tracemalloc
+
+from models import Match, RankingItem, decode
+
+
+TEAMS_PER_GROUP = 16
+
+
+def participant(group: int, team: int):
+    return {
+        "id": f"{group}{team:04d}",
+        "name": f"Team {group}-{team}",
+        "custom_fields": {
+            "emote": f"Team{group}x{team}",
+            "short_name": f"T{team}",
+            "captain": f"Captain {team}",
+            "country": "GB"
+        }
+    }
+
+
+def ranking_page(group: int):
+    "Returns the ranking items of a group as JSON."
+
+    return json.dumps([{
+        "id": f"{group}{team:04d}",
+        "group_id": str(group),
+        "number": team + 1,
+        "position": team + 1,
+        "rank": team + 1,
+        "participant": participant(group, team),
+        "points": 30 - team,
+        "properties": {
+            "wins": 10 - team % 10,
+            "draws": 0,
+            "losses": team % 10,
+            "forfeits": 0,
+            "score_for": 40,
+            "score_against": 30,
+            "score_difference": 10 - team
+        }
+    } for team in range(TEAMS_PER_GROUP)])
+
+
+def match_page(group: int):
+    "Returns one round of matches of a group as JSON."
+
+    return json.dumps([{
+        "id": f"{group}{team:04d}",
+        "stage_id": "1",
+        "group_id": str(group),
+        "round_id": "1",
+        "number": team // 2 + 1,
+        "type": "duel",
+        "status": "completed",
+        "scheduled_datetime": "2021-03-01T19:00:00+00:00",
+        "played_at": "2021-03-01T19:00:00+00:00",
+        "public_note": None,
+        "opponents": [{
+            "number": side + 1,
+            "position": side + 1,
+            "result": "win" if side == 0 else "loss",
+            "rank": None,
+            "forfeit": False,
+            "score": 3 - side,
+            "participant": participant(group, team + side)
+        } for side in range(2)]
+    } for team in range(0, TEAMS_PER_GROUP, 2)])
+
+
+def retained_memory(decode_pages, group_num: int):
+    "Decodes the pages of every group and returns how many bytes the decoded data keeps allocated."
+
+    pages = [(ranking_page(group), match_page(group)) for group in range(group_num)]
+
+    gc.collect()
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+
+    data = [decode_pages(ranking, matches) for ranking, matches in pages]
+
+    gc.collect()
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del data
+    return end - start
+
+
+def main(group_num: int = 200):
+    as_dicts = retained_memory(lambda ranking, matches: (json.loads(ranking), json.loads(matches)), group_num)
+    as_models = retained_memory(lambda ranking, matches: (decode(json.loads(ranking), RankingItem), decode(json.loads(matches), Match)), group_num)
+
+    print(f"{group_num} groups with {TEAMS_PER_GROUP} teams and {TEAMS_PER_GROUP // 2} matches each")
+    print(f"{'dictionaries':<14} {as_dicts / 1024:9.1f} KiB | {as_dicts / group_num:8.0f} B per group")
+    print(f"{'models':<14} {as_models / 1024:9.1f} KiB | {as_models / group_num:8.0f} B per group")
+    print(f"Memory reduction: {(1 - as_models / as_dicts) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
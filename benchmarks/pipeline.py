@@ -0,0 +1,212 @@
+"""End-to-end benchmark of the +group and +sequence rendering pipeline.
+
+EmbedGenerator.generate_embed_async and generate_sequence_embeds_async are run with the AsyncToornamentAPI client the bot
+uses, against the local Toornament stub with synthetic tournaments of varying size. All runs share one event loop and
+client, as in the bot. Every run starts cold: the response cache is disabled and rendered embeds and emojis are
+invalidated, so each run requests, decodes and renders everything (ETag revalidation still applies, as in production).
+
+For every scenario the latency percentiles, the peak and net allocations and the time spent in each phase are reported.
+Phase times are summed over all tasks and threads, so they can exceed the latency of concurrent sequence requests.
+
+Usage (from the repository root): python -m benchmarks.pipeline [repetitions] [--paced] [--blocking]
+    --paced:    Uses the default rate limits of the client instead of disabling them, to include rate limit sleeps.
+    --blocking: Also runs generate_embed and generate_sequence_embeds with the blocking ToornamentAPI client.
+"""
+
+import asyncio
+import inspect
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import aiohttp
+import requests
+
+import fast_json
+from benchmarks.toornament_stub import ToornamentStub, synthetic_tournament, write_credentials
+from embed_generator import EmbedGenerator
+from models import Group
+from rate_limiter import RateLimiter, TokenBucket
+from response_cache import ResponseCache
+from toornament import AsyncToornamentAPI, ToornamentAPI
+
+
+# Name, number of groups, teams per group, whether the guild has an emoji for every team
+SCENARIOS = [
+    ("small", 2, 6, True),
+    ("medium", 8, 10, True),
+    ("large", 16, 16, True),
+    ("large, no emojis", 16, 16, False)
+]
+
+# Latency of the stub per request in seconds
+LATENCY = 0.005
+
+
+class PhaseTimer:
+    """Measures the time spent in functions by temporarily replacing them with timed wrappers.
+    Used as a context manager, the original functions are restored on exit.
+    """
+
+    def __init__(self):
+        self.totals = {}
+        self.__patches = []
+        self.__lock = threading.Lock()
+
+    def time(self, phase: str, owner, name: str):
+        "Adds the time spent in the function or coroutine function 'name' of a class or module to a phase."
+
+        function = getattr(owner, name)
+
+        def add(start: float):
+            with self.__lock:
+                self.totals[phase] = self.totals.get(phase, 0.0) + time.perf_counter() - start
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+
+            try:
+                return function(*args, **kwargs)
+            finally:
+                add(start)
+
+        async def timed_async(*args, **kwargs):
+            start = time.perf_counter()
+
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                add(start)
+
+        self.__patches += [(owner, name, function)]
+        setattr(owner, name, timed_async if inspect.iscoroutinefunction(function) else timed)
+
+    def reset(self):
+        with self.__lock:
+            self.totals = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        for owner, name, function in reversed(self.__patches):
+            setattr(owner, name, function)
+
+
+def fake_context(guild_id: int, tournament, with_emojis: bool):
+    "Returns a stand-in for a command context whose guild has an emoji for every team of the tournament, if requested."
+
+    emote_names = {item["participant"]["custom_fields"]["emote"] for item in tournament["ranking_items"]}
+    emojis = [SimpleNamespace(name = name, id = 10 ** 17 + index) for index, name in enumerate(sorted(emote_names))] if with_emojis else []
+
+    return SimpleNamespace(guild = SimpleNamespace(id = guild_id, emojis = emojis))
+
+
+def run(function, repetitions: int, before_run, timer: PhaseTimer):
+    "Runs a function repeatedly and returns its latencies in ms, the mean phase times in ms and the allocations of the last run."
+
+    latencies = []
+    timer.reset()
+
+    for _ in range(repetitions):
+        before_run()
+
+        start = time.perf_counter()
+        function()
+        latencies += [(time.perf_counter() - start) * 1000]
+
+    phases = {phase: total / repetitions * 1000 for phase, total in timer.totals.items()}
+
+    # Measures the allocations of one more run separately, as tracing slows it down
+    before_run()
+    tracemalloc.start()
+    snapshot = tracemalloc.take_snapshot()
+
+    function()
+
+    net_blocks = sum(stat.count_diff for stat in tracemalloc.take_snapshot().compare_to(snapshot, 'filename'))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return latencies, phases, peak, net_blocks
+
+
+def percentile(values, percent: float):
+    "Returns the given percentile of a list of values (nearest rank)."
+
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+
+def report(name: str, latencies, phases, peak: int, net_blocks: int):
+    print(f"  {name:<20} p50 {percentile(latencies, 50):8.2f} ms | p90 {percentile(latencies, 90):8.2f} ms | p99 {percentile(latencies, 99):8.2f} ms"
+          f" | peak {peak / 1024:8.1f} KiB | net blocks {net_blocks:+7d}")
+    print("                       " + " | ".join(f"{phase} {duration:.2f} ms" for phase, duration in phases.items()))
+
+
+def scenario(name: str, group_num: int, teams_per_group: int, with_emojis: bool, repetitions: int, paced: bool, blocking: bool, timer: PhaseTimer):
+    tournament = synthetic_tournament("1", group_num = group_num, teams_per_group = teams_per_group)
+    ctx = fake_context(1, tournament, with_emojis)
+    loop = asyncio.new_event_loop()
+
+    with ToornamentStub([tournament], latency = LATENCY) as stub, tempfile.TemporaryDirectory() as directory:
+        limits = lambda: RateLimiter() if paced else RateLimiter({"viewer": TokenBucket(rate = 1e9, burst = 10 ** 6)})
+        credentials = write_credentials(directory)
+
+        async_too = AsyncToornamentAPI(credentials, rate_limiter = limits(), cache = ResponseCache(max_entries = 0))
+        async_too.api_url = stub.url
+
+        too = ToornamentAPI(credentials, rate_limiter = limits(), cache = ResponseCache(max_entries = 0))
+        too.api_url = stub.url
+
+        # The embed generator keeps its database in data/ of the working directory
+        working_dir = os.getcwd()
+        os.chdir(directory)
+
+        try:
+            embed_gen = EmbedGenerator()
+
+            for group in tournament["groups"]:
+                group_info = Group.from_json(dict(group, tournament_id = "1"))
+                embed_gen.add_stage(f"g{group['number']}", group_info, "https://example.com/logo.png", "#00AAFF", ctx.guild.id)
+
+            embed_gen.add_sequence("all", [f"g{group['number']}" for group in tournament["groups"]], ctx.guild.id)
+
+            cold = lambda: embed_gen.invalidate_emojis(ctx.guild)
+
+            print(f"{name}: {group_num} groups, {teams_per_group} teams per group, {'with' if with_emojis else 'without'} emojis")
+            report("+group", *run(lambda: loop.run_until_complete(embed_gen.generate_embed_async(ctx, async_too, "g1", 1)), repetitions, cold, timer))
+            report("+sequence", *run(lambda: loop.run_until_complete(embed_gen.generate_sequence_embeds_async(ctx, async_too, "all", 1)), repetitions, cold, timer))
+
+            if blocking:
+                report("+group (blocking)", *run(lambda: embed_gen.generate_embed(ctx, too, "g1", 1), repetitions, cold, timer))
+                report("+sequence (blocking)", *run(lambda: embed_gen.generate_sequence_embeds(ctx, too, "all", 1), repetitions, cold, timer))
+        finally:
+            os.chdir(working_dir)
+            loop.run_until_complete(async_too.close())
+            loop.close()
+            too.close()
+
+
+def main(repetitions: int = 20, paced: bool = False, blocking: bool = False):
+    with PhaseTimer() as timer:
+        timer.time("network", aiohttp.ClientSession, "_request")
+        timer.time("network", requests.Session, "request")
+        timer.time("rate limits", RateLimiter, "acquire_async")
+        timer.time("rate limits", RateLimiter, "acquire")
+        timer.time("json", fast_json, "loads")
+        timer.time("ranking text", EmbedGenerator, "_EmbedGenerator__generate_ranking_text")
+        timer.time("fixture text", EmbedGenerator, "_EmbedGenerator__generate_fixture_text")
+
+        for name, group_num, teams_per_group, with_emojis in SCENARIOS:
+            scenario(name, group_num, teams_per_group, with_emojis, repetitions, paced, blocking, timer)
+
+
+if __name__ == "__main__":
+    arguments = [argument for argument in sys.argv[1:] if not argument.startswith("--")]
+    main(int(arguments[0]) if arguments else 20, "--paced" in sys.argv, "--blocking" in sys.argv)
@@ -0,0 +1,99 @@
+"""Compares the per-request latency of fresh connections against the pooled keep-alive sessions of AsyncToornamentAPI,
+which the bot uses, and of ToornamentAPI. All run against a local stub of the stage endpoint, so no credentials or network access are needed.
+
+Usage (from the repository root): python -m benchmarks.session_pool [requests]
+"""
+
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+
+import aiohttp
+import requests
+
+from benchmarks.toornament_stub import ToornamentStub, write_credentials
+from rate_limiter import RateLimiter, TokenBucket
+from response_cache import ResponseCache
+from toornament import AsyncToornamentAPI, ToornamentAPI
+
+
+def measure(function, request_num: int):
+    "Calls a function request_num times and returns the latency of each call in milliseconds."
+
+    latencies = []
+
+    for _ in range(request_num):
+        start = time.perf_counter()
+        function()
+        latencies += [(time.perf_counter() - start) * 1000]
+
+    return latencies
+
+
+async def measure_async(coroutine_function, request_num: int):
+    "Awaits a coroutine function request_num times and returns the latency of each call in milliseconds."
+
+    latencies = []
+
+    for _ in range(request_num):
+        start = time.perf_counter()
+        await coroutine_function()
+        latencies += [(time.perf_counter() - start) * 1000]
+
+    return latencies
+
+
+async def fresh_async_get(url: str):
+    "Requests a URL with a new aiohttp session, so a new connection is opened."
+
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url, headers = {"X-Api-Key": "benchmark"}) as response:
+            return await response.json()
+
+
+async def compare_async(too: AsyncToornamentAPI, stage_url: str, request_num: int):
+    "Returns the latencies of fresh aiohttp sessions and of the pooled session of the asynchronous client."
+
+    async with too:
+        fresh = await measure_async(lambda: fresh_async_get(stage_url), request_num)
+        pooled = await measure_async(lambda: too.get_stage(1, 1), request_num)
+
+    return fresh, pooled
+
+
+def report(name: str, latencies):
+    print(f"{name:<26} mean {statistics.mean(latencies):7.3f} ms | median {statistics.median(latencies):7.3f} ms | max {max(latencies):7.3f} ms")
+
+
+def main(request_num: int = 500):
+    with ToornamentStub() as stub, tempfile.TemporaryDirectory() as directory:
+        # Disables the client-side pacing and the response cache, only connection handling is measured.
+        unlimited = RateLimiter({"viewer": TokenBucket(rate = 1e9, burst = request_num)})
+
+        credentials = write_credentials(directory)
+        stage_url = f"{stub.url}/viewer/v2/tournaments/1/stages/1"
+
+        async_too = AsyncToornamentAPI(credentials, rate_limiter = unlimited, cache = ResponseCache(max_entries = 0))
+        async_too.api_url = stub.url
+        fresh_async, pooled_async = asyncio.run(compare_async(async_too, stage_url, request_num))
+
+        too = ToornamentAPI(credentials, rate_limiter = unlimited, cache = ResponseCache(max_entries = 0))
+        too.api_url = stub.url
+        fresh = measure(lambda: requests.get(stage_url, headers = {"X-Api-Key": "benchmark"}).json(), request_num)
+        pooled = measure(lambda: too.get_stage(1, 1), request_num)
+
+        too.close()
+
+    report("fresh connections (async)", fresh_async)
+    report("pooled session (async)", pooled_async)
+    print(f"Median latency reduction: {(1 - statistics.median(pooled_async) / statistics.median(fresh_async)) * 100:.1f}%")
+
+    report("fresh connections", fresh)
+    report("pooled session", pooled)
+    print(f"Median latency reduction: {(1 - statistics.median(pooled) / statistics.median(fresh)) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,342 @@
+"""Local stub of the Toornament API for benchmarks, serving synthetic tournaments over keep-alive HTTP/1.1.
+
+It emulates the viewer endpoints used by the clients (tournaments, stages, groups, ranking items and matches) with
+Range-based pagination, ETags, the OAuth2 token endpoint, and optionally a fixed latency and 429 responses.
+
+Usage:
+    with ToornamentStub([synthetic_tournament("1", group_num = 4)], latency = 0.02) as stub:
+        too = ToornamentAPI(write_credentials(directory))
+        too.api_url = stub.url
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+### SYNTHETIC DATA ###
+
+def round_robin(team_num: int):
+    "Returns the rounds of a round-robin schedule as lists of (home, away) team indices (circle method)."
+
+    teams = list(range(team_num)) + ([None] if team_num % 2 else [])
+    rounds = []
+
+    for _ in range(len(teams) - 1):
+        pairs = [(teams[index], teams[-index - 1]) for index in range(len(teams) // 2)]
+        rounds += [[pair for pair in pairs if None not in pair]]
+        teams = [teams[0], teams[-1]] + teams[1:-1]
+
+    return rounds
+
+
+def participant(group_num: int, team: int):
+    "Returns a participant with an emote and short name custom field. The emote is named 'G<group>T<team>'."
+
+    return {
+        "id": f"{group_num}{team:04d}",
+        "name": f"Group {group_num} Team {team}",
+        "custom_fields": {
+            "emote": f"G{group_num}T{team}",
+            "short_name": f"G{group_num}T{team}"
+        }
+    }
+
+
+def synthetic_tournament(tournament_id: str = "1", stage_id: str = "1", group_num: int = 4, teams_per_group: int = 8, played_rounds: int = None):
+    """Returns the data of a tournament with one league stage, whose groups play a round-robin with one round per week.
+
+    group_num:       Number of groups in the stage.
+    teams_per_group: Number of teams in every group.
+    played_rounds:   Number of rounds that have been completed. Defaults to half of the rounds.
+    """
+
+    groups = []
+    ranking_items = []
+    matches = []
+
+    for group_index in range(group_num):
+        group_id = f"{stage_id}{group_index + 1:03d}"
+        groups += [{"id": group_id, "stage_id": stage_id, "number": group_index + 1, "name": f"Group {group_index + 1}", "closed": False}]
+
+        rounds = round_robin(teams_per_group)
+        completed_rounds = len(rounds) // 2 if played_rounds is None else played_rounds
+        records = [{"wins": 0, "losses": 0, "score_difference": 0} for _ in range(teams_per_group)]
+
+        for round_index, pairs in enumerate(rounds):
+            for match_index, (home, away) in enumerate(pairs):
+                completed = round_index < completed_rounds
+                forfeit = completed and (round_index + match_index + group_index) % 13 == 12
+                home_score = None if not completed else (home * 7 + round_index) % 4
+                away_score = None if not completed else (away * 5 + round_index) % 4
+
+                if completed:
+                    winner, loser = (home, away) if forfeit or home_score >= away_score else (away, home)
+                    records[winner]["wins"] += 1
+                    records[loser]["losses"] += 1
+                    records[home]["score_difference"] += home_score - away_score
+                    records[away]["score_difference"] += away_score - home_score
+
+                matches += [{
+                    "id": f"{group_id}{round_index:02d}{match_index:02d}",
+                    "stage_id": stage_id,
+                    "group_id": group_id,
+                    "round_id": f"{group_id}{round_index:02d}",
+                    "number": match_index + 1,
+                    "round_number": round_index + 1,
+                    "type": "duel",
+                    "status": "completed" if completed else "pending",
+                    "scheduled_datetime": None,
+                    "opponents": [
+                        {"number": 1, "position": 1, "forfeit": False, "score": home_score, "participant": participant(group_index + 1, home)},
+                        {"number": 2, "position": 2, "forfeit": forfeit, "score": away_score, "participant": participant(group_index + 1, away)}
+                    ]
+                }]
+
+        standings = sorted(range(teams_per_group), key = lambda team: (-records[team]["wins"], -records[team]["score_difference"], team))
+
+        ranking_items += [{
+            "id": f"{group_id}{position:04d}",
+            "group_id": group_id,
+            "number": position + 1,
+            "position": position + 1,
+            "rank": position + 1,
+            "participant": participant(group_index + 1, team),
+            "points": records[team]["wins"] * 3,
+            "properties": dict(records[team], draws = 0, forfeits = 0)
+        } for position, team in enumerate(standings)]
+
+    return {
+        "tournament": {"id": tournament_id, "name": f"Tournament {tournament_id}", "discipline": "rocketleague", "logo": {"logo_small": "https://example.com/logo.png"}},
+        "stage": {"id": stage_id, "name": "Regular Season", "type": "league"},
+        "groups": groups,
+        "ranking_items": ranking_items,
+        "matches": matches
+    }
+
+
+def write_credentials(directory: str, expired: bool = False):
+    """Writes dummy API credentials to a JSON-file in the given directory and returns its path.
+    If expired is True, the authorization token has to be refreshed from the OAuth2 endpoint first.
+    """
+
+    auth_expiry = datetime.datetime(2000 if expired else 2100, 1, 1)
+    credential_path = os.path.join(directory, "toornament.json")
+
+    with open(credential_path, 'w', encoding='utf-8') as credential_file:
+        json.dump({
+            "token": "benchmark",
+            "client_id": "benchmark",
+            "client_secret": "benchmark",
+            "auth_key": "benchmark",
+            "auth_expiry": auth_expiry.strftime("%d.%m.%Y, %H:%M:%S")
+        }, credential_file)
+
+    return credential_path
+
+
+### SERVER ###
+
+class StubHandler(BaseHTTPRequestHandler):
+    "Answers the requests to the stub over keep-alive HTTP/1.1 connections."
+
+    protocol_version = "HTTP/1.1"
+
+    routes = [
+        (re.compile(r"^/viewer/v2/tournaments/(\w+)$"), "tournament"),
+        (re.compile(r"^/viewer/v2/tournaments/(\w+)/stages/(\w+)$"), "stage"),
+        (re.compile(r"^/viewer/v2/tournaments/(\w+)/groups$"), "groups"),
+        (re.compile(r"^/viewer/v2/tournaments/(\w+)/stages/(\w+)/ranking-items$"), "ranking_items"),
+        (re.compile(r"^/viewer/v2/tournaments/(\w+)/matches$"), "matches")
+    ]
+
+    def do_GET(self):
+        stub = self.server.stub
+
+        if not stub.admit(self):
+            return
+
+        if self.headers.get('X-Api-Key') is None:
+            self.__send_json(401, {"errors": [{"message": "Missing API key"}]})
+            return
+
+        url = urlsplit(self.path)
+        query = {name: values[0] for name, values in parse_qs(url.query, keep_blank_values = True).items()}
+
+        for pattern, endpoint in self.routes:
+            match = pattern.match(url.path)
+
+            if match is not None:
+                tournament = stub.tournaments.get(match.group(1))
+
+                if tournament is None:
+                    break
+
+                if endpoint in ("tournament", "stage"):
+                    self.__send_json(200, tournament[endpoint])
+                else:
+                    self.__send_page(endpoint, stub.filter(tournament, endpoint, query))
+
+                return
+
+        self.__send_json(404, {"errors": [{"message": "Not found"}]})
+
+    def do_POST(self):
+        stub = self.server.stub
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+        if not stub.admit(self):
+            return
+
+        if urlsplit(self.path).path != "/oauth/v2/token":
+            self.__send_json(404, {"errors": [{"message": "Not found"}]})
+            return
+
+        stub.count("token")
+        self.__send_json(200, {"access_token": f"stub-token-{stub.request_count}", "token_type": "Bearer", "expires_in": 86400, "scope": "organizer:participant organizer:result"})
+
+    def __send_page(self, endpoint: str, items):
+        "Sends the requested range of items like the Toornament API: 206 Partial Content with a Content-Range header."
+
+        unit = {"groups": "groups", "ranking_items": "items", "matches": "matches"}[endpoint]
+        page_size = self.server.stub.page_sizes[unit]
+
+        range_match = re.match(rf"^{unit}=(\d+)-(\d+)$", self.headers.get('Range', ''))
+        first_index, last_index = (int(range_match.group(1)), int(range_match.group(2))) if range_match else (0, page_size - 1)
+        last_index = min(last_index, first_index + page_size - 1, len(items) - 1)
+
+        if not items:
+            self.__send_json(200, [])
+        elif first_index >= len(items) or last_index < first_index:
+            self.__send_json(416, {"errors": [{"message": "Range not satisfiable"}]})
+        else:
+            self.__send_json(206, items[first_index:last_index + 1], {"Content-Range": f"{unit} {first_index}-{last_index}/{len(items)}"})
+
+    def __send_json(self, status: int, payload, headers = {}):
+        "Sends a JSON response with an ETag. Answers with 304 Not Modified if the client already has this version."
+
+        body = json.dumps(payload).encode('utf-8')
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+
+        if status < 300 and self.headers.get('If-None-Match') == etag:
+            status, body = 304, b""
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+
+        for name, value in headers.items():
+            self.send_header(name, value)
+
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_rate_limited(self, retry_after: float):
+        body = json.dumps({"errors": [{"message": "Too many requests"}]}).encode('utf-8')
+
+        self.send_response(429)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Retry-After", str(retry_after))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ToornamentStub:
+    """Local HTTP server emulating the Toornament API for the given synthetic tournaments.
+    The server runs in a background thread from start() (or entering the context) until stop().
+    """
+
+    def __init__(self, tournaments = None, latency: float = 0.0, rate_limit_every: int = 0, retry_after: float = 1, page_sizes: dict = None):
+        """tournaments:      List of tournaments as returned by synthetic_tournament(). Defaults to one tournament with ID "1".
+        latency:          Seconds every request is delayed before it's answered.
+        rate_limit_every: Answers every n-th request with 429 Too Many Requests, 0 to never limit requests.
+        retry_after:      Seconds sent in the Retry-After header of 429 responses.
+        page_sizes:       Maximum number of items per page for every range unit. Defaults to the limits of the Toornament API.
+        """
+        tournaments = tournaments if tournaments is not None else [synthetic_tournament()]
+
+        self.tournaments = {tournament["tournament"]["id"]: tournament for tournament in tournaments}
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.page_sizes = dict({"groups": 50, "items": 50, "matches": 128}, **(page_sizes or {}))
+
+        self.request_count = 0
+        self.rate_limited_count = 0
+        self.endpoint_counts = {}
+
+        self.__lock = threading.Lock()
+        self.__server = None
+
+    @property
+    def url(self):
+        "Base URL of the stub, to be set as api_url of a client."
+        return f"http://127.0.0.1:{self.__server.server_port}"
+
+    def start(self):
+        self.__server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.__server.daemon_threads = True
+        self.__server.stub = self
+        threading.Thread(target = self.__server.serve_forever, daemon = True).start()
+        return self
+
+    def stop(self):
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.stop()
+
+    def count(self, endpoint: str):
+        with self.__lock:
+            self.endpoint_counts[endpoint] = self.endpoint_counts.get(endpoint, 0) + 1
+
+    def admit(self, handler: StubHandler):
+        "Delays a request by the configured latency. Returns False if the request was answered with 429 instead."
+
+        with self.__lock:
+            self.request_count += 1
+            rate_limited = self.rate_limit_every > 0 and self.request_count % self.rate_limit_every == 0
+
+            if rate_limited:
+                self.rate_limited_count += 1
+
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        if rate_limited:
+            handler.send_rate_limited(self.retry_after)
+            return False
+
+        return True
+
+    def filter(self, tournament, endpoint: str, query):
+        "Returns the items of a paginated endpoint that match the filters of the query."
+
+        self.count(endpoint)
+        items = tournament[endpoint]
+
+        group_ids = [group_id for group_id in query.get("group_ids", "").split(',') if group_id]
+        round_numbers = [int(round_number) for round_number in query.get("round_numbers", "").split(',') if round_number]
+
+        if group_ids and endpoint != "groups":
+            items = [item for item in items if item["group_id"] in group_ids]
+
+        if round_numbers and endpoint == "matches":
+            items = [item for item in items if item["round_number"] in round_numbers]
+
+        return items
@@ -1,12 +1,26 @@
+import asyncio
+import io
+import os
+import time
+
+import aiohttp
 import discord
 from discord.ext import commands
 
-from toornament import ToornamentAPI
+import metrics
+from circuit_breaker import CircuitOpenError
+from toornament import AsyncToornamentAPI
 from embed_generator import EmbedGenerator
 from permission_manager import PermissionManager
+from standings_poller import StandingsPoller
+
+# Initializes Toornament API and restores the responses cached before the last shutdown, so the bot starts warm.
+too = AsyncToornamentAPI("auth/toornament.json")
 
-# Initializes Toornament API.
-too = ToornamentAPI("auth/toornament.json")
+cache_snapshot = "data/cache.json"
+cache_snapshot_interval = 300
+cache_snapshot_task = None
+print(f"Restored {too.cache.load(cache_snapshot)} cached API responses.")
 
 # Initializes Discord bot.
 with open("auth/discord.token", 'r') as token_file:
@@ -19,8 +33,101 @@ embed_gen = EmbedGenerator()
 # Initializes permission manager.
 perms = PermissionManager()
 
+# Initializes the local Prometheus endpoint and the metrics of the commands. The port can be changed with the METRICS_PORT environment variable.
+metrics_server = metrics.MetricsServer(port = int(os.environ.get("METRICS_PORT", 9108)))
+command_seconds = metrics.registry.histogram("bot_command_seconds", "Duration of the bot commands, by command name.")
+
 # Initializing bot.
-bot = commands.Bot(command_prefix = '+')
+class StandingsBot(commands.Bot):
+    "Bot that also closes the Toornament API session when it shuts down."
+
+    async def close(self):
+        poller.stop()
+        metrics_server.stop()
+
+        if cache_snapshot_task is not None:
+            cache_snapshot_task.cancel()
+
+        save_cache_snapshot()
+        await too.close()
+        await super().close()
+
+bot = StandingsBot(command_prefix = '+')
+
+# Errors of the Toornament API that are reported to the user instead of failing the command.
+api_errors = (CircuitOpenError, aiohttp.ClientError, asyncio.TimeoutError)
+
+def api_error_message(error: Exception):
+    "Returns the reply to a command whose Toornament API request failed."
+
+    if isinstance(error, CircuitOpenError):
+        return str(error)
+
+    if isinstance(error, asyncio.TimeoutError):
+        return "The Toornament API didn't answer in time, please try again later."
+
+    return f"Couldn't reach the Toornament API, please try again later: {error}"
+
+
+def save_cache_snapshot():
+    "Saves the API cache to the snapshot file that is loaded on the next start."
+
+    try:
+        too.cache.save(cache_snapshot)
+    except OSError as error:
+        print(f"Couldn't save the cache snapshot: {error}")
+
+async def save_cache_snapshots():
+    "Saves the API cache regularly, so a crash only loses the responses of the last interval."
+
+    while True:
+        await asyncio.sleep(cache_snapshot_interval)
+        await bot.loop.run_in_executor(None, save_cache_snapshot)
+
+# Initializes the poller that keeps tracked posts up-to-date.
+poller = StandingsPoller(bot, too, embed_gen)
+
+
+@bot.event
+async def on_ready():
+    # Drops permissions of roles that were deleted while the bot was offline.
+    for guild in bot.guilds:
+        perms.remove_deleted_roles(guild)
+
+    poller.start()
+    too.start_token_refresh()
+
+    global cache_snapshot_task
+
+    if cache_snapshot_task is None or cache_snapshot_task.done():
+        cache_snapshot_task = asyncio.ensure_future(save_cache_snapshots())
+
+    # The bot works without its metrics, e.g. if the port is already in use
+    try:
+        metrics_server.start()
+    except OSError as error:
+        print(f"Couldn't start the metrics server on port {metrics_server.port}: {error}")
+
+
+@bot.before_invoke
+async def start_command_timer(ctx: commands.Context):
+    ctx.command_start = time.perf_counter()
+
+
+@bot.after_invoke
+async def observe_command_duration(ctx: commands.Context):
+    command_seconds.observe(time.perf_counter() - ctx.command_start, command = ctx.command.name)
+
+
+@bot.event
+async def on_guild_role_delete(role: discord.Role):
+    perms.remove_role(role)
+
+
+@bot.event
+async def on_guild_emojis_update(guild: discord.Guild, before, after):
+    embed_gen.invalidate_emojis(guild)
+
 
 @bot.command()
 async def ping(ctx):
@@ -50,8 +157,11 @@ async def addgroup(ctx: commands.Context, tournament_id, group_name: str, alias:
         return
 
     # Finds the group on Toornament.com.
-    group = too.get_group_info(tournament_id, group_name)
-
+    try:
+        group = await too.get_group_info(tournament_id, group_name)
+    except api_errors as error:
+        await ctx.send(api_error_message(error))
+        return
 
     # Checks if the group exists.
     if group is None:
@@ -59,11 +169,15 @@ async def addgroup(ctx: commands.Context, tournament_id, group_name: str, alias:
         return
 
     # Adds the group to the bot.
-    embed_gen.add_stage(alias, group, logo_url, colour)
+    try:
+        embed_gen.add_stage(alias, group, logo_url, colour, ctx.guild.id)
+    except ValueError as error:
+        await ctx.send(f"Couldn't add group '{group_name}': {error}")
+        return
 
     # Gives feedback to the user.
-    stage_id = group["stage_id"]
-    group_id = group["id"]
+    stage_id = group.stage_id
+    group_id = group.id
     await ctx.send(f"Added group '{group_name}' with ID '{group_id}' for stage '{stage_id}'!")
 
 
@@ -83,7 +197,9 @@ async def removegroup(ctx: commands.Context, group_name: str):
         return
 
     # Removes the group from the bot.
-    embed_gen.remove_stage(group_name)
+    if embed_gen.remove_stage(group_name, ctx.guild.id) is None:
+        await ctx.send(f"Couldn't find group '{group_name}'.")
+        return
 
     # Gives feedback to the user.
     await ctx.send(f"Removed group '{group_name}' from the bot.")
@@ -106,12 +222,72 @@ async def group(ctx: commands.Context, group_name: str, week):
         return
 
     # Generates the embed for this group in the given week.
-    embed = embed_gen.generate_embed(ctx, too, group_name, week)
+    try:
+        embed = await embed_gen.generate_embed_async(ctx, too, group_name, week)
+    except ValueError as error:
+        await ctx.send(str(error))
+        return
+    except api_errors as error:
+        await ctx.send(api_error_message(error))
+        return
 
     # Posts the embed to the channel.
     await ctx.send(embed = embed)
 
 
+@bot.command()
+async def track(ctx: commands.Context, group_name: str, week):
+    """Posts the ranking and fixtures of a single group and keeps the post updated as results come in.
+
+    Parameters:
+    #1 - Group name: Name or alias of the group to be posted about.
+    #2 - Week:       Number of the week for which the fixtures should be posted.
+
+    Example: !track Vortex 3
+    """
+
+    # Checks if the user has permission to use this command.
+    if not perms.has_perms(ctx):
+        await ctx.send("Permission denied")
+        return
+
+    # Generates the embed for this group in the given week and posts it.
+    try:
+        embed = await embed_gen.generate_embed_async(ctx, too, group_name, week)
+    except ValueError as error:
+        await ctx.send(str(error))
+        return
+    except api_errors as error:
+        await ctx.send(api_error_message(error))
+        return
+
+    message = await ctx.send(embed = embed)
+
+    # Registers the post, so it's edited whenever the standings or results change.
+    poller.track(message, group_name, week)
+
+
+@bot.command()
+async def untrack(ctx: commands.Context, message_id: int):
+    """Stops updating a post created with the track command.
+
+    Parameters:
+    #1 - Message ID: ID of the posted message.
+    """
+
+    # Checks if the user has permission to use this command.
+    if not perms.has_perms(ctx):
+        await ctx.send("Permission denied")
+        return
+
+    # Only posts of this guild can be untracked.
+    if poller.untrack(message_id, ctx.guild.id) is None:
+        await ctx.send(f"Couldn't find tracked message '{message_id}'.")
+        return
+
+    await ctx.send(f"Stopped updating message '{message_id}'.")
+
+
 @bot.command()
 async def addsequence(ctx: commands.Context, seq_name: str, seq_groups: str):
     """Adds a sequence of multiple groups to be posted at once in a given order.
@@ -132,7 +308,11 @@ async def addsequence(ctx: commands.Context, seq_name: str, seq_groups: str):
     groups = seq_groups.split(',')
 
     # Adds the sequence to the bot.
-    embed_gen.add_sequence(seq_name, groups)
+    try:
+        embed_gen.add_sequence(seq_name, groups, ctx.guild.id)
+    except ValueError as error:
+        await ctx.send(f"Couldn't create sequence '{seq_name}': {error}")
+        return
 
     # Feedback to the user.
     group_str = '\n'.join(groups)
@@ -153,7 +333,9 @@ async def removesequence(ctx: commands.Context, seq_name: str):
         return
 
     # Removes the sequence from the bot.
-    embed_gen.remove_sequence(seq_name)
+    if embed_gen.remove_sequence(seq_name, ctx.guild.id) is None:
+        await ctx.send(f"Couldn't find sequence '{seq_name}'.")
+        return
 
     # Feedback to the user.
     await ctx.send(f"Removed sequence '{seq_name}'.")
@@ -174,7 +356,14 @@ async def sequence(ctx: commands.Context, seq_name: str, week):
         return
 
     # Generates a ranking&fixture embed for every group in the sequence.
-    embeds = embed_gen.generate_sequence_embeds(ctx, too, seq_name, week)
+    try:
+        embeds = await embed_gen.generate_sequence_embeds_async(ctx, too, seq_name, week)
+    except ValueError as error:
+        await ctx.send(str(error))
+        return
+    except api_errors as error:
+        await ctx.send(api_error_message(error))
+        return
 
     # Posts all the embeds.
     for embed in embeds:
@@ -226,5 +415,25 @@ async def removerole(ctx: commands.Context, role: discord.Role):
     perms.remove_role(role)
     
 
+@bot.command()
+async def stats(ctx: commands.Context):
+    """Sends the metrics of the bot (API calls, rate limit waits, cache hits and command durations) in the Prometheus text format.
+    Only administrators can use this command.
+
+    Example: +stats
+    """
+
+    # Checks if the user is an administrator.
+    if not ctx.author.permissions_in(ctx.channel).administrator:
+        await ctx.send("Permission denied")
+        return
+
+    request_stats = too.request_stats()
+    summary = f"Cache hits: {request_stats['hits']} ({request_stats['stale']} stale), revalidated: {request_stats['revalidated']}, downloaded: {request_stats['misses']}, circuit breaker: {too.circuit_breaker.state}"
+
+    metrics_file = discord.File(io.BytesIO(metrics.registry.render().encode('utf-8')), filename = "metrics.txt")
+    await ctx.send(summary, file = metrics_file)
+
+
 print("Starting bot...")
-bot.run(token)
\ No newline at end of file
+bot.run(token)
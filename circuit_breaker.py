@@ -0,0 +1,83 @@
+import metrics
+import threading
+import time
+
+# State changes and rejected calls of the circuit breakers, see metrics.py
+state_changes = metrics.registry.counter("toornament_circuit_breaker_state_changes_total", "Times a circuit breaker of the Toornament API changed its state, by new state.")
+rejected_calls = metrics.registry.counter("toornament_circuit_breaker_rejected_total", "Requests that weren't sent to the Toornament API because its circuit breaker was open.")
+
+class CircuitOpenError(Exception):
+    "Raised instead of sending a request while the circuit breaker is open."
+
+
+class CircuitBreaker:
+    """Stops sending requests to an API that keeps failing, so callers fail fast instead of waiting for timeouts and retries.
+    After failure_threshold consecutive failures the circuit opens and all calls are rejected with a CircuitOpenError.
+    Once reset_timeout seconds have passed, a single trial call is let through (half-open): Its success closes the circuit again,
+    its failure opens it for another reset_timeout seconds.
+    """
+
+    closed = "closed"
+    open = "open"
+    half_open = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """failure_threshold: Number of consecutive failures after which the circuit opens.
+        reset_timeout:     Seconds the circuit stays open before a trial call is let through.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.__state = self.closed
+        self.__failures = 0
+        self.__opened_at = 0.0
+        self.__trial_running = False
+        self.__lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self.__lock:
+            return self.__state
+
+    def __change_state(self, state: str):
+        if state != self.__state:
+            self.__state = state
+            state_changes.inc(state = state)
+
+    def allow(self):
+        "Raises a CircuitOpenError if a call must not be sent now. Otherwise the caller has to report its outcome with record_success() or record_failure()."
+
+        with self.__lock:
+            if self.__state == self.closed:
+                return
+
+            if self.__state == self.open and time.monotonic() - self.__opened_at >= self.reset_timeout:
+                self.__change_state(self.half_open)
+
+            # Only one trial call at a time while half-open, the others are still rejected
+            if self.__state == self.half_open and not self.__trial_running:
+                self.__trial_running = True
+                return
+
+            rejected_calls.inc()
+            retry_in = max(self.reset_timeout - (time.monotonic() - self.__opened_at), 0.0)
+            raise CircuitOpenError(f"The Toornament API failed {self.__failures} times in a row, requests are paused for {retry_in:.0f} seconds.")
+
+    def record_success(self):
+        "Reports a successful call, which closes the circuit."
+
+        with self.__lock:
+            self.__failures = 0
+            self.__trial_running = False
+            self.__change_state(self.closed)
+
+    def record_failure(self):
+        "Reports a failed call. Opens the circuit if the failure threshold is reached or the trial call of a half-open circuit failed."
+
+        with self.__lock:
+            self.__failures += 1
+            self.__trial_running = False
+
+            if self.__state == self.half_open or self.__failures >= self.failure_threshold:
+                self.__opened_at = time.monotonic()
+                self.__change_state(self.open)
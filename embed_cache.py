@@ -0,0 +1,65 @@
+import metrics
+from collections import OrderedDict
+
+import discord
+
+# Rendered embed cache metrics, see metrics.py
+embed_cache_requests = metrics.registry.counter("embed_cache_requests_total", "Lookups in the rendered embed cache by result (hit or miss).")
+
+class EmbedCache:
+    """Bounded LRU cache of rendered embeds.
+    Embeds are stored under the guild (whose emotes they show), the stage, the week and a fingerprint of the data they were rendered from,
+    so a changed ranking or result simply leads to a new entry. The cached embeds themselves are returned and must not be modified.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        "max_entries: Maximum number of cached embeds. The least recently used one is dropped when it's exceeded."
+        self.max_entries = max_entries
+
+        self.__entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(*data):
+        """Returns a hashable key of the given models and lists of models, which changes whenever any of the data changes.
+        The models are immutable and hashable, so the key is just a tuple of them and is compared field by field on lookups.
+        """
+        return tuple(tuple(value) if isinstance(value, list) else value for value in data)
+
+    def get(self, guild_id, group_id, week, fingerprint):
+        "Returns the cached embed or None if there is none."
+
+        key = (guild_id, group_id, str(week), fingerprint)
+        embed = self.__entries.get(key)
+
+        if embed is None:
+            self.misses += 1
+            embed_cache_requests.inc(result = "miss")
+            return None
+
+        self.__entries.move_to_end(key)
+        self.hits += 1
+        embed_cache_requests.inc(result = "hit")
+        return embed
+
+    def put(self, guild_id, group_id, week, fingerprint, embed: discord.Embed):
+        "Caches a rendered embed."
+
+        key = (guild_id, group_id, str(week), fingerprint)
+
+        self.__entries[key] = embed
+        self.__entries.move_to_end(key)
+
+        while len(self.__entries) > self.max_entries:
+            self.__entries.popitem(last = False)
+
+    def invalidate(self, guild_id = None, group_id = None):
+        "Removes all cached embeds of a guild and/or group. Without arguments the whole cache is cleared."
+
+        for key in list(self.__entries):
+            if (guild_id is None or key[0] == guild_id) and (group_id is None or key[1] == group_id):
+                del self.__entries[key]
+
+    def __len__(self):
+        return len(self.__entries)
@@ -1,55 +1,32 @@
-from toornament import ToornamentAPI
-from persistent_json import JSONStorage
+from toornament import ToornamentAPI, AsyncToornamentAPI
+from models import Group, Match, Opponent, RankingItem, Tournament
+from persistent_sqlite import SQLiteStorage
+from registry import SequenceRegistry, StageRegistry
+from emoji_index import EmojiIndex
+from embed_cache import EmbedCache
+from response_cache import StaleResult
+import metrics
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 
 import discord
 from discord.ext import commands
 
+# Time spent building the text of embeds, see metrics.py
+render_seconds = metrics.registry.histogram("embed_render_seconds", "Seconds spent building the ranking and fixture text of an embed.")
+
 class EmbedGenerator:
 
     def __init__(self):
-        self.__stages = JSONStorage("data/stages.json")
-        self.__sequences = JSONStorage("data/sequences.json")
+        self.__stages = StageRegistry(SQLiteStorage("data/bot.db", "stages", StageRegistry.storage_key, migrate_from = "data/stages.json"))
+        self.__sequences = SequenceRegistry(SQLiteStorage("data/bot.db", "sequences", SequenceRegistry.storage_key, migrate_from = "data/sequences.json"))
+        self.__emojis = EmojiIndex()
+        self.__rendered = EmbedCache()
 
 
     ### GENERATING THE FIXTURES ###
 
-    def __get_emote_id(self, guild: discord.Guild, emote_name: str):
-        """Returns the mention of an emote with a given name in a certain guild.
-
-        Parameters:
-        guild:      discord.Guild object of the server with the emote.
-        emote_name: Name of the emote to search.
-        """
-
-        emote_name = emote_name.lower()
-
-        for emoji in guild.emojis:
-            if emoji.name.lower() == emote_name:
-                return f"<:{emoji.name}:{emoji.id}>"
-        
-        return None
-
-    def __team_name_to_emote_name(self, team_name: str):
-        """Guesses the emote name of a given team.
-        For this, whitespaces are removed and following letters are capitalized.
-
-        Parameters:
-        team_name: Name of the team to guess the emote for.
-        """
-
-        prev_whitespace = True
-        emote_name = ""
-        for char in team_name:
-            if char == ' ':
-                prev_whitespace = True
-            elif prev_whitespace:
-                emote_name += char.upper()
-                prev_whitespace = False
-            else:
-                emote_name += char
-
-        return emote_name
-
     def __find_emote_id(self, guild: discord.Guild, team_info: dict):
         """Finds the emote ID for a given team.
         First the given emote name is searched, secondly an emote name is guessed from the team name.
@@ -58,60 +35,43 @@ class EmbedGenerator:
         guild: discord.Guild object of the server with the emote.
         team_info: Dictionary describing the team.
         """
+        return self.__emojis.team_emote(guild, team_info["emote"], team_info["name"])
 
-        # If an emote is given for the team: Tries to find the emote in the guild.
-        if team_info["emote"] is not None:
-            emote_id = self.__get_emote_id(guild, team_info["emote"])
-
-            if emote_id is not None:
-                return emote_id
+    def invalidate_emojis(self, guild: discord.Guild):
+        "Makes the generator pick up changed emojis of a guild. Must be called whenever a guild's emojis are updated."
+        self.__emojis.invalidate(guild)
+        self.__rendered.invalidate(guild_id = guild.id)
 
-        # If no emote was given, or the given one was invalid:
-        # Guesses an alternative emote name based on the team name.
-        guessed_emote = self.__team_name_to_emote_name(team_info["name"])
+    def __forfeit_score(self, team: Opponent):
+        "Returns the score shown for a team in a forfeited match: 'W' if it didn't forfeit or 'FF' if it did."
+        return "FF" if team.forfeit else "W"
 
-        # Tries to find the guessed emote.
-        emote_id = self.__get_emote_id(guild, guessed_emote)
-
-        # Returns grey question mark as a default is no emote is found for the team.
-        if emote_id is None:
-            return ":grey_question:"
-
-        return emote_id
-
-    def __apply_match_forfeit(self, team):
-        "Changes the score of a team to 'W' if it didn't forfeit or 'FF' if it did."
-
-        if team["forfeit"]:
-            team["score"] = "FF"
-        else:
-            team["score"] = "W"
 
-
-    def __get_match_info(self, match):
+    def __get_match_info(self, match: Match):
         "Extracts the most important info from a match."
 
-        home_team = match["opponents"][0]
-        away_team = match["opponents"][1]
+        home_team, away_team = match.opponents
+        home_score = home_team.score
+        away_score = away_team.score
 
-        # Converts scores to W and FF if there was at least one forfeit
-        if home_team["forfeit"] or away_team["forfeit"]:
-            self.__apply_match_forfeit(home_team)
-            self.__apply_match_forfeit(away_team)
+        # Shows scores as W and FF if there was at least one forfeit
+        if home_team.forfeit or away_team.forfeit:
+            home_score = self.__forfeit_score(home_team)
+            away_score = self.__forfeit_score(away_team)
 
         return {
-            "status": match["status"],
+            "status": match.status,
             "home_team": {
-                "name": home_team["participant"]["name"],
-                "emote": home_team["participant"]["custom_fields"]["emote"],
-                "short": home_team["participant"]["custom_fields"]["short_name"],
-                "score": home_team["score"]
+                "name": home_team.name,
+                "emote": home_team.emote,
+                "short": home_team.short_name,
+                "score": home_score
             },
             "away_team": {
-                "name": away_team["participant"]["name"],
-                "emote": away_team["participant"]["custom_fields"]["emote"],
-                "short": away_team["participant"]["custom_fields"]["short_name"],
-                "score": away_team["score"]
+                "name": away_team.name,
+                "emote": away_team.emote,
+                "short": away_team.short_name,
+                "score": away_score
             }
         }
 
@@ -148,11 +108,15 @@ class EmbedGenerator:
             return f"{home_str} {result_str} {away_str}"
 
 
+    def get_fixture_info(self, matches):
+        "Extracts the information shown in the fixtures from every match."
+        return [self.__get_match_info(match) for match in matches]
+
     def __generate_fixture_text(self, guild: discord.Guild, matches):
         "Generates a text for all given fixtures."
 
         # Extracts needed information for all matches.
-        matches = [self.__get_match_info(match) for match in matches]
+        matches = self.get_fixture_info(matches)
 
         # Generates string for every match and joins them.
         match_str = [self.__get_match_string(guild, match) for match in matches]
@@ -201,28 +165,24 @@ class EmbedGenerator:
                 entry[key] = padded_content
 
 
-    def __get_rank_info(self, team):
+    def __get_rank_info(self, team: RankingItem):
         "Returns all important information on a single team from a ranking and formats each element as string."
 
-        rank = team['rank']
+        rank = team.rank
 
         if rank is None:
-            rank = team['position']
+            rank = team.position
 
-        name = team["participant"]["custom_fields"]["short_name"]
+        name = team.short_name
 
         if name is None:
-            name   = team['participant']['name']
-            
-        wins   = team['properties']['wins']
-        losses = team['properties']['losses']
-        diff   = team['properties']['score_difference']
+            name = team.name
 
         return {
             "rank": f"#{rank}",
             "name": name,
-            "win_loss": f"{wins}-{losses}",
-            "diff": f"{diff:+}"
+            "win_loss": f"{team.wins}-{team.losses}",
+            "diff": f"{team.score_difference:+}"
         }
 
 
@@ -232,11 +192,15 @@ class EmbedGenerator:
         return separator.join(values)
 
 
+    def get_ranking_info(self, ranking):
+        "Extracts the information shown in the ranking table from every team, formatted as strings but not padded yet."
+        return [self.__get_rank_info(team) for team in ranking]
+
     def __generate_ranking_text(self, ranking):
         "Generates a text-based ranking table."
 
         # Extracts all needed info from the ranking
-        ranking = [self.__get_rank_info(team) for team in ranking]
+        ranking = self.get_ranking_info(ranking)
 
         # Pads all fields to have the same width for every team so that they line up in a table.
         keys = ["rank", "name", "win_loss", "diff"]
@@ -252,52 +216,56 @@ class EmbedGenerator:
 
     ### STAGES ### 
 
-    def add_stage(self, alias, group_info, logo_url, colour):
+    def add_stage(self, alias, group_info: Group, logo_url, colour, guild_id = None):
+        "Adds a stage to the namespace of a guild. Raises a ValueError if the alias is already used there."
 
         stage_info = {
             "alias": alias.lower(),
-            "group": group_info,
+            "group": group_info.to_dict(),
             "logo": logo_url,
             "colour": colour
         }
 
-        self.__stages.content += [stage_info]
-        self.__stages.save()
+        self.__stages.add(stage_info, guild_id)
+        self.__rendered.invalidate(group_id = group_info.id)
 
-    def remove_stage(self, alias):
+    def remove_stage(self, alias, guild_id = None):
+        "Removes a stage by its alias or group name. Returns the removed stage or None if there was none."
 
-        stages = []
+        stage = self.__stages.remove(alias, guild_id)
 
-        for stage in self.__stages.content:
-            if not stage["alias"] == alias and not stage["group"]["name"] == alias:
-                stages += [stage]
+        if stage is not None:
+            self.__rendered.invalidate(group_id = stage["group"]["id"])
 
-        self.__stages.content = stages
-        self.__stages.save()
-        
+        return stage
 
-    def get_stage(self, stage_name: str):
 
-        stage_name = stage_name.lower()
-        for stage in self.__stages.content:
-            if stage["alias"] == stage_name or stage["group"]["name"] == stage_name:
-                return stage
-            
-        return None
+    def get_stage(self, stage_name: str, guild_id = None):
+        "Returns the stage with the given alias or group name in the namespace of a guild, or None if there is none."
+        return self.__stages.get(stage_name, guild_id)
 
 
 
-    def generate_embed(self, ctx: commands.Context, too: ToornamentAPI, stage_name: str, week):
+    def build_embed(self, guild: discord.Guild, stage, week, tournament: Tournament, ranking, matches):
+        """Renders the ranking and fixtures of a stage into an embed.
+        Rendered embeds are cached, so rendering the same data for the same guild again only costs a lookup.
+        If the ranking or matches are stale cache entries that are being refreshed, the footer says so.
+        """
 
-        stage = self.get_stage(stage_name) # TODO: Handle if stage isn't found.
         group = stage["group"]
+        stale = isinstance(ranking, StaleResult) or isinstance(matches, StaleResult)
 
-        tournament = too.get_tournament(group["tournament_id"])
-        ranking = too.get_ranking(group["tournament_id"], group["stage_id"], group["id"])
-        matches = too.get_matches(group["tournament_id"], group["stage_id"], group["id"], week)
+        fingerprint = EmbedCache.fingerprint(group["name"], stage["colour"], stage["logo"], tournament, ranking, matches, stale)
+        embed = self.__rendered.get(guild.id, group["id"], week, fingerprint)
+
+        if embed is not None:
+            return embed
+
+        with render_seconds.time(part = "ranking"):
+            ranking_text = f"```{self.__generate_ranking_text(ranking)}```"
 
-        ranking_text = f"```{self.__generate_ranking_text(ranking)}```"
-        matches_text = self.__generate_fixture_text(ctx.guild, matches)
+        with render_seconds.time(part = "fixtures"):
+            matches_text = self.__generate_fixture_text(guild, matches)
 
         embed = discord.Embed(
             title = group["name"],
@@ -307,50 +275,165 @@ class EmbedGenerator:
         )
 
         embed.set_thumbnail(url = stage["logo"])
-        embed.set_footer(text = tournament["name"], icon_url = tournament["logo"]["logo_small"])
+        embed.set_footer(text = f"{tournament.name} (updating, may be outdated)" if stale else tournament.name, icon_url = tournament.logo_small)
 
         embed.add_field(name = "Standings", value = ranking_text, inline = False)
         embed.add_field(name = f"Week {week}", value = matches_text, inline = False)
 
+        self.__rendered.put(guild.id, group["id"], week, fingerprint, embed)
+
         return embed
 
+    def __find_stage(self, stage_name: str, guild_id):
+        "Returns the stage with the given alias or group name. Raises a ValueError if there is none."
+
+        stage = self.get_stage(stage_name, guild_id)
+
+        if stage is None:
+            raise ValueError(f"Couldn't find group '{stage_name}'.")
+
+        return stage
+
+    def generate_embed(self, ctx: commands.Context, too: ToornamentAPI, stage_name: str, week):
+        "Generates the ranking&fixture embed of a stage in the given week. Raises a ValueError if the stage doesn't exist."
+
+        stage = self.__find_stage(stage_name, ctx.guild.id)
+        group = stage["group"]
+
+        tournament = too.get_tournament(group["tournament_id"])
+        ranking = too.get_ranking(group["tournament_id"], group["stage_id"], group["id"])
+        matches = too.get_matches(group["tournament_id"], group["stage_id"], group["id"], week)
+
+        return self.build_embed(ctx.guild, stage, week, tournament, ranking, matches)
+
+    async def generate_embed_async(self, ctx: commands.Context, too: AsyncToornamentAPI, stage_name: str, week):
+        "Same as generate_embed, but awaits the asynchronous API client so the event loop isn't blocked."
+
+        stage = self.__find_stage(stage_name, ctx.guild.id)
+        group = stage["group"]
+
+        tournament, ranking, matches = await asyncio.gather(
+            too.get_tournament(group["tournament_id"]),
+            too.get_ranking(group["tournament_id"], group["stage_id"], group["id"]),
+            too.get_matches(group["tournament_id"], group["stage_id"], group["id"], week)
+        )
+
+        return self.build_embed(ctx.guild, stage, week, tournament, ranking, matches)
+
 
 
     ### SEQUENCES ###
 
-    def add_sequence(self, alias: str, stage_list: list):
+    def add_sequence(self, alias: str, stage_list: list, guild_id = None):
+        "Adds a sequence to the namespace of a guild. Raises a ValueError if the alias is already used there."
 
         sequence_info = {
             "alias": alias.lower(),
             "groups": stage_list
         }
 
-        self.__sequences.content += [sequence_info]
-        self.__sequences.save()
+        self.__sequences.add(sequence_info, guild_id)
+
+    def remove_sequence(self, alias: str, guild_id = None):
+        "Removes a sequence. Returns the removed sequence or None if there was none."
+        return self.__sequences.remove(alias, guild_id)
+
+    def get_sequence(self, sequence_name: str, guild_id = None):
+        "Returns the sequence with the given alias in the namespace of a guild, or None if there is none."
+        return self.__sequences.get(sequence_name, guild_id)
+
+
+    def __find_sequence_stages(self, sequence_name: str, guild_id):
+        "Returns the stages of a sequence in its order. Raises a ValueError if the sequence or one of its groups doesn't exist."
+
+        sequence = self.get_sequence(sequence_name, guild_id)
+
+        if sequence is None:
+            raise ValueError(f"Couldn't find sequence '{sequence_name}'.")
 
-    def remove_sequence(self, alias: str):
+        stages = [self.get_stage(group_name, guild_id) for group_name in sequence["groups"]]
+        missing_names = [group_name for group_name, stage in zip(sequence["groups"], stages) if stage is None]
 
-        sequences = []
+        if missing_names:
+            raise ValueError(f"Couldn't find the groups {', '.join(repr(group_name) for group_name in missing_names)} of sequence '{sequence_name}'.")
 
-        for sequence in self.__sequences.content:
-            if not sequence["alias"] == alias:
-                sequences += [sequence]
+        return stages
 
-        self.__sequences.content = sequences
-        self.__sequences.save()
+    def __group_stages_by_api_stage(self, stages):
+        "Groups the given stages by the Toornament tournament and stage of their group. Returns a dictionary of (tournament ID, stage ID) to a list of group IDs."
 
-    def get_sequence(self, sequence_name: str):
+        batches = {}
 
-        sequence_name = sequence_name.lower()
-        for sequence in self.__sequences.content:
-            if sequence["alias"] == sequence_name:
-                return sequence
+        for stage in stages:
+            group = stage["group"]
+            group_ids = batches.setdefault((group["tournament_id"], group["stage_id"]), [])
 
-        return None
+            if group["id"] not in group_ids:
+                group_ids += [group["id"]]
+
+        return batches
+
+    def generate_sequence_embeds(self, ctx: commands.Context, too: ToornamentAPI, sequence_name: str, week, max_concurrency: int = 8):
+        """Generates the embeds of all groups in a sequence, in the order of the sequence.
+        Groups of the same Toornament stage are requested together with one filtered request per endpoint,
+        and the requests of different stages run concurrently (paced by the rate limiter of the API client).
+        Every tournament is only requested once, even if several groups belong to it.
+
+        Raises a ValueError if the sequence or one of its groups doesn't exist.
+
+        max_concurrency: Maximum number of API calls running at the same time.
+        """
+
+        stages = self.__find_sequence_stages(sequence_name, ctx.guild.id)
+        batches = self.__group_stages_by_api_stage(stages)
+
+        tournament_ids = {tournament_id for tournament_id, _ in batches}
+
+        with ThreadPoolExecutor(max_workers = max_concurrency) as executor:
+            tournaments = {tournament_id: executor.submit(too.get_tournament, tournament_id) for tournament_id in tournament_ids}
+            rankings = [executor.submit(too.get_rankings_for_groups, tournament_id, stage_id, group_ids) for (tournament_id, stage_id), group_ids in batches.items()]
+            fixtures = [executor.submit(too.get_matches_for_groups, tournament_id, stage_id, group_ids, week) for (tournament_id, stage_id), group_ids in batches.items()]
+
+            tournaments = {tournament_id: future.result() for tournament_id, future in tournaments.items()}
+            rankings = {group_id: ranking for future in rankings for group_id, ranking in future.result().items()}
+            fixtures = {group_id: matches for future in fixtures for group_id, matches in future.result().items()}
+
+        embeds = [self.build_embed(ctx.guild, stage, week,
+            tournaments[stage["group"]["tournament_id"]],
+            rankings[stage["group"]["id"]],
+            fixtures[stage["group"]["id"]]
+        ) for stage in stages]
+
+        return embeds
+
+    async def generate_sequence_embeds_async(self, ctx: commands.Context, too: AsyncToornamentAPI, sequence_name: str, week, max_concurrency: int = 8):
+        "Same as generate_sequence_embeds, but awaits the asynchronous API client so the event loop isn't blocked."
+
+        stages = self.__find_sequence_stages(sequence_name, ctx.guild.id)
+        batches = self.__group_stages_by_api_stage(stages)
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def bounded(coroutine):
+            async with semaphore:
+                return await coroutine
+
+        tournament_ids = list({tournament_id for tournament_id, _ in batches})
+
+        tournaments, rankings, fixtures = await asyncio.gather(
+            asyncio.gather(*[bounded(too.get_tournament(tournament_id)) for tournament_id in tournament_ids]),
+            asyncio.gather(*[bounded(too.get_rankings_for_groups(tournament_id, stage_id, group_ids)) for (tournament_id, stage_id), group_ids in batches.items()]),
+            asyncio.gather(*[bounded(too.get_matches_for_groups(tournament_id, stage_id, group_ids, week)) for (tournament_id, stage_id), group_ids in batches.items()])
+        )
 
+        tournaments = dict(zip(tournament_ids, tournaments))
+        rankings = {group_id: ranking for batch in rankings for group_id, ranking in batch.items()}
+        fixtures = {group_id: matches for batch in fixtures for group_id, matches in batch.items()}
 
-    def generate_sequence_embeds(self, ctx: commands.Context, too: ToornamentAPI, sequence_name: str, week):
+        embeds = [self.build_embed(ctx.guild, stage, week,
+            tournaments[stage["group"]["tournament_id"]],
+            rankings[stage["group"]["id"]],
+            fixtures[stage["group"]["id"]]
+        ) for stage in stages]
 
-        sequence = self.get_sequence(sequence_name) # TODO: Handle if sequence isn't found
-        embeds = [self.generate_embed(ctx, too, group_name, week) for group_name in sequence["groups"]]
         return embeds
@@ -0,0 +1,80 @@
+import discord
+
+class EmojiIndex:
+    """Case-insensitive index of the emojis of every guild, plus a memo of which emote is shown for which team.
+    The index of a guild is built on first use and must be invalidated when the guild's emojis change.
+    """
+
+    def __init__(self):
+        self.__emotes = {}
+        self.__team_emotes = {}
+
+    def __build(self, guild: discord.Guild):
+        "Indexes the emojis of a guild by their lower-case name. If several emojis share a name, the first one is used."
+
+        emotes = {}
+
+        for emoji in guild.emojis:
+            emotes.setdefault(emoji.name.lower(), f"<:{emoji.name}:{emoji.id}>")
+
+        self.__emotes[guild.id] = emotes
+        self.__team_emotes[guild.id] = {}
+
+    def invalidate(self, guild: discord.Guild):
+        "Drops the index of a guild, so it's rebuilt with the current emojis on the next lookup."
+
+        self.__emotes.pop(guild.id, None)
+        self.__team_emotes.pop(guild.id, None)
+
+    def get(self, guild: discord.Guild, emote_name: str):
+        """Returns the mention of an emote with a given name in a certain guild, or None if there is none.
+
+        Parameters:
+        guild:      discord.Guild object of the server with the emote.
+        emote_name: Name of the emote to search (case-insensitive).
+        """
+
+        if guild.id not in self.__emotes:
+            self.__build(guild)
+
+        return self.__emotes[guild.id].get(emote_name.lower())
+
+    def __team_name_to_emote_name(self, team_name: str):
+        """Guesses the emote name of a given team.
+        For this, whitespaces are removed and following letters are capitalized.
+        """
+        return ''.join(word[:1].upper() + word[1:] for word in team_name.split(' '))
+
+    def team_emote(self, guild: discord.Guild, emote_name: str, team_name: str):
+        """Returns the emote of a team in a guild.
+        First the given emote name is searched, secondly an emote name is guessed from the team name.
+        If neither exists, a grey question mark is returned. Results are memoised until the guild's index is invalidated.
+
+        Parameters:
+        guild:      discord.Guild object of the server with the emote.
+        emote_name: Name of the team's emote or None if it has none.
+        team_name:  Name of the team.
+        """
+
+        if guild.id not in self.__emotes:
+            self.__build(guild)
+
+        team_emotes = self.__team_emotes[guild.id]
+        team_key = (emote_name, team_name)
+
+        if team_key not in team_emotes:
+            emote_id = None
+
+            # If an emote is given for the team: Tries to find the emote in the guild.
+            if emote_name is not None:
+                emote_id = self.get(guild, emote_name)
+
+            # If no emote was given, or the given one was invalid:
+            # Guesses an alternative emote name based on the team name.
+            if emote_id is None:
+                emote_id = self.get(guild, self.__team_name_to_emote_name(team_name))
+
+            # Uses grey question mark as a default if no emote is found for the team.
+            team_emotes[team_key] = emote_id if emote_id is not None else ":grey_question:"
+
+        return team_emotes[team_key]
@@ -0,0 +1,43 @@
+"""JSON encoding and decoding with the fastest installed backend: orjson, ujson or the standard library's json, in that order.
+The backend is selected once on import. All backends produce compact JSON without whitespace and accept str or bytes to decode.
+"""
+
+import json
+
+try:
+    import orjson
+
+    backend = "orjson"
+
+    def loads(data):
+        "Decodes JSON from a str or bytes object."
+        return orjson.loads(data)
+
+    def dumps(value, default = None) -> str:
+        "Encodes a value as compact JSON. default is called for objects that can't be encoded otherwise."
+        return orjson.dumps(value, default = default).decode('utf-8')
+
+except ImportError:
+    try:
+        import ujson
+
+        backend = "ujson"
+
+        def loads(data):
+            "Decodes JSON from a str or bytes object."
+            return ujson.loads(data)
+
+        def dumps(value, default = None) -> str:
+            "Encodes a value as compact JSON. default is called for objects that can't be encoded otherwise."
+            return ujson.dumps(value, ensure_ascii = False, escape_forward_slashes = False, default = default)
+
+    except ImportError:
+        backend = "json"
+
+        def loads(data):
+            "Decodes JSON from a str or bytes object."
+            return json.loads(data)
+
+        def dumps(value, default = None) -> str:
+            "Encodes a value as compact JSON. default is called for objects that can't be encoded otherwise."
+            return json.dumps(value, ensure_ascii = False, separators = (',', ':'), default = default)
@@ -0,0 +1,263 @@
+import asyncio
+import functools
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Counters and latency histograms of the hot paths, exported in the Prometheus text format.
+# All metrics are registered in the process-wide `registry`, which can be served over HTTP with MetricsServer.
+# See: https://prometheus.io/docs/instrumenting/exposition_formats/
+
+def _label_key(labels: dict):
+    return tuple(sorted(labels.items()))
+
+def _format_labels(label_key, extra = ()):
+    labels = list(label_key) + list(extra)
+
+    if not labels:
+        return ""
+
+    return "{" + ",".join(f'{name}="{str(value)}"' for name, value in labels) + "}"
+
+def _format_number(value: float):
+    if value == float("inf"):
+        return "+Inf"
+
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    "Monotonically increasing value per set of labels, e.g. the number of requests per endpoint."
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+
+        self.__values = {}
+        self.__lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        "Increases the counter of the given labels."
+
+        key = _label_key(labels)
+
+        with self.__lock:
+            self.__values[key] = self.__values.get(key, 0) + amount
+
+    def value(self, **labels):
+        "Returns the current value of the counter of the given labels."
+
+        with self.__lock:
+            return self.__values.get(_label_key(labels), 0)
+
+    def samples(self):
+        "Returns the lines of the counter in the Prometheus text format."
+
+        with self.__lock:
+            values = dict(self.__values)
+
+        return [f"{self.name}{_format_labels(key)} {_format_number(value)}" for key, value in sorted(values.items())]
+
+
+class Histogram:
+    "Distribution of observed values (e.g. durations in seconds) per set of labels, counted in cumulative buckets."
+
+    type_name = "histogram"
+
+    # Upper bounds of the buckets in seconds
+    default_buckets = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, name: str, documentation: str, buckets = None):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets if buckets is not None else self.default_buckets) + (float("inf"),)
+
+        # Label key to [bucket counts, sum, count]
+        self.__values = {}
+        self.__lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        "Adds an observed value to the distribution of the given labels."
+
+        key = _label_key(labels)
+
+        with self.__lock:
+            if key not in self.__values:
+                self.__values[key] = [[0] * len(self.buckets), 0.0, 0]
+
+            bucket_counts, _, _ = entry = self.__values[key]
+
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    bucket_counts[index] += 1
+                    break
+
+            entry[1] += value
+            entry[2] += 1
+
+    def time(self, **labels):
+        "Returns a context manager that observes how many seconds its block took."
+        return _Timer(self, labels)
+
+    def summary(self, **labels):
+        "Returns a tuple of the number and the sum of the observed values of the given labels."
+
+        with self.__lock:
+            _, total, count = self.__values.get(_label_key(labels), (None, 0.0, 0))
+            return count, total
+
+    def samples(self):
+        "Returns the lines of the histogram in the Prometheus text format."
+
+        with self.__lock:
+            values = {key: (list(bucket_counts), total, count) for key, (bucket_counts, total, count) in self.__values.items()}
+
+        lines = []
+
+        for key, (bucket_counts, total, count) in sorted(values.items()):
+            cumulative = 0
+
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines += [f"{self.name}_bucket{_format_labels(key, [('le', _format_number(bound))])} {cumulative}"]
+
+            lines += [f"{self.name}_sum{_format_labels(key)} {_format_number(total)}"]
+            lines += [f"{self.name}_count{_format_labels(key)} {count}"]
+
+        return lines
+
+
+class _Timer:
+    "Context manager of Histogram.time()."
+
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.__histogram = histogram
+        self.__labels = labels
+
+    def __enter__(self):
+        self.__start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.__histogram.observe(time.perf_counter() - self.__start, **self.__labels)
+
+
+class MetricsRegistry:
+    "Collection of all metrics of the process. Metrics are created on first use and returned again for the same name."
+
+    def __init__(self):
+        self.__metrics = {}
+        self.__lock = threading.Lock()
+
+    def __get_or_create(self, metric_class, name: str, *args):
+        with self.__lock:
+            if name not in self.__metrics:
+                self.__metrics[name] = metric_class(name, *args)
+
+            metric = self.__metrics[name]
+
+        if not isinstance(metric, metric_class):
+            raise ValueError(f"Metric '{name}' is already registered as a {metric.type_name}.")
+
+        return metric
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self.__get_or_create(Counter, name, documentation)
+
+    def histogram(self, name: str, documentation: str, buckets = None) -> Histogram:
+        return self.__get_or_create(Histogram, name, documentation, buckets)
+
+    def render(self):
+        "Returns all metrics in the Prometheus text format."
+
+        with self.__lock:
+            metrics = [self.__metrics[name] for name in sorted(self.__metrics)]
+
+        lines = []
+
+        for metric in metrics:
+            lines += [f"# HELP {metric.name} {metric.documentation}", f"# TYPE {metric.name} {metric.type_name}"]
+            lines += metric.samples()
+
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry used by all modules
+registry = MetricsRegistry()
+
+
+def timed(histogram: Histogram, **labels):
+    "Decorator that observes the duration of every call of a function or coroutine function in a histogram."
+
+    def decorator(function):
+
+        if asyncio.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def timed_coroutine(*args, **kwargs):
+                with histogram.time(**labels):
+                    return await function(*args, **kwargs)
+
+            return timed_coroutine
+
+        @functools.wraps(function)
+        def timed_function(*args, **kwargs):
+            with histogram.time(**labels):
+                return function(*args, **kwargs)
+
+        return timed_function
+
+    return decorator
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    "Serves the metrics of the registry on /metrics."
+
+    def do_GET(self):
+        if self.path.split('?')[0] != "/metrics":
+            self.send_error(404)
+            return
+
+        body = self.server.registry.render().encode('utf-8')
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    "HTTP server exporting a metrics registry for Prometheus in a background thread."
+
+    def __init__(self, metrics_registry: MetricsRegistry = None, port: int = 9108, host: str = "127.0.0.1"):
+        """metrics_registry: Registry to export. Defaults to the process-wide registry.
+        port:             Local port to listen on.
+        host:             Address to listen on. Defaults to localhost, so the metrics aren't reachable from outside.
+        """
+        self.registry = metrics_registry if metrics_registry is not None else registry
+        self.port = port
+        self.host = host
+
+        self.__server = None
+
+    def start(self):
+        "Starts serving the metrics. Does nothing if the server is already running."
+
+        if self.__server is not None:
+            return
+
+        self.__server = ThreadingHTTPServer((self.host, self.port), MetricsHandler)
+        self.__server.daemon_threads = True
+        self.__server.registry = self.registry
+        threading.Thread(target = self.__server.serve_forever, daemon = True).start()
+
+    def stop(self):
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
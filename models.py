@@ -0,0 +1,208 @@
+from dataclasses import asdict, dataclass, is_dataclass
+
+# Compact, immutable models of the Toornament API responses.
+# Only the fields the bot renders are parsed, the rest of the JSON is dropped right after decoding.
+# Instances can't be modified, so data shared between caches and callers can't be changed by accident.
+
+@dataclass(frozen = True)
+class RankingItem:
+    "A team's line in the ranking of a group."
+
+    __slots__ = ("group_id", "position", "rank", "name", "short_name", "wins", "losses", "score_difference")
+
+    group_id: str
+    position: int
+    rank: int
+    name: str
+    short_name: str
+    wins: int
+    losses: int
+    score_difference: int
+
+    @classmethod
+    def from_json(cls, item: dict):
+        "Decodes a ranking item of the viewer API: https://developer.toornament.com/v2/doc/viewer_ranking_items"
+
+        participant = item["participant"]
+        properties = item["properties"]
+
+        return cls(
+            group_id = item["group_id"],
+            position = item["position"],
+            rank = item["rank"],
+            name = participant["name"],
+            short_name = participant["custom_fields"]["short_name"],
+            wins = properties["wins"],
+            losses = properties["losses"],
+            score_difference = properties["score_difference"]
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        "Restores a model from the data returned by to_json."
+        return cls(**data)
+
+
+@dataclass(frozen = True)
+class Opponent:
+    "A team taking part in a match."
+
+    __slots__ = ("name", "emote", "short_name", "score", "forfeit")
+
+    name: str
+    emote: str
+    short_name: str
+    score: int
+    forfeit: bool
+
+    @classmethod
+    def from_json(cls, opponent: dict):
+        participant = opponent["participant"]
+
+        return cls(
+            name = participant["name"],
+            emote = participant["custom_fields"]["emote"],
+            short_name = participant["custom_fields"]["short_name"],
+            score = opponent["score"],
+            forfeit = opponent["forfeit"]
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        "Restores a model from the data returned by to_json."
+        return cls(**data)
+
+
+@dataclass(frozen = True)
+class Match:
+    "A match between two opponents."
+
+    __slots__ = ("group_id", "status", "opponents")
+
+    group_id: str
+    status: str
+    opponents: tuple
+
+    @classmethod
+    def from_json(cls, match: dict):
+        "Decodes a match of the viewer API: https://developer.toornament.com/v2/doc/viewer_matches"
+
+        return cls(
+            group_id = match["group_id"],
+            status = match["status"],
+            opponents = tuple(Opponent.from_json(opponent) for opponent in match["opponents"])
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        "Restores a model from the data returned by to_json."
+        return cls(data["group_id"], data["status"], tuple(Opponent.from_dict(opponent) for opponent in data["opponents"]))
+
+
+@dataclass(frozen = True)
+class Group:
+    "A group of a tournament stage. The tournament ID isn't part of the API response and is added when the group is looked up."
+
+    __slots__ = ("id", "stage_id", "number", "name", "tournament_id")
+
+    id: str
+    stage_id: str
+    number: int
+    name: str
+    tournament_id: str
+
+    @classmethod
+    def from_json(cls, group: dict):
+        "Decodes a group of the viewer API: https://developer.toornament.com/v2/doc/viewer_groups"
+
+        return cls(
+            id = group["id"],
+            stage_id = group["stage_id"],
+            number = group.get("number"),
+            name = group["name"],
+            tournament_id = group.get("tournament_id")
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        "Restores a model from the data returned by to_json."
+        return cls(**data)
+
+    def to_dict(self):
+        "Returns the group as a dictionary, e.g. to store it with a stage."
+        return asdict(self)
+
+
+@dataclass(frozen = True)
+class Tournament:
+    "A tournament with the details shown in the embed footers."
+
+    __slots__ = ("id", "name", "logo_small")
+
+    id: str
+    name: str
+    logo_small: str
+
+    @classmethod
+    def from_json(cls, tournament: dict):
+        "Decodes a tournament of the viewer API: https://developer.toornament.com/v2/doc/viewer_tournaments"
+
+        logo = tournament.get("logo")
+
+        return cls(
+            id = tournament["id"],
+            name = tournament["name"],
+            logo_small = logo["logo_small"] if logo is not None else None
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        "Restores a model from the data returned by to_json."
+        return cls(**data)
+
+
+def decode(payload, model):
+    "Decodes a JSON object, or each object of a JSON list, into the given model. Without a model the JSON is returned as it is."
+
+    if model is None:
+        return payload
+
+    if isinstance(payload, list):
+        return [model.from_json(item) for item in payload]
+
+    return model.from_json(payload)
+
+
+def to_json(value):
+    "Converts a model into JSON-serialisable data. Can be used as the default function of json.dumps."
+
+    if is_dataclass(value):
+        return asdict(value)
+
+    return str(value)
+
+
+# Model classes by name, to restore models that were converted with to_json
+model_classes = {model.__name__: model for model in [RankingItem, Opponent, Match, Group, Tournament]}
+
+def model_name(value):
+    "Returns the name of the model class of a model or of the models in a list, or None if the value is plain JSON."
+
+    if isinstance(value, list):
+        return model_name(value[0]) if value else None
+
+    return type(value).__name__ if type(value).__name__ in model_classes and is_dataclass(value) else None
+
+
+def restore(name: str, data):
+    "Restores a model, or each model of a list, from the data returned by to_json. Without a model name the data is returned as it is."
+
+    if name is None:
+        return data
+
+    model = model_classes[name]
+
+    if isinstance(data, list):
+        return [model.from_dict(item) for item in data]
+
+    return model.from_dict(data)
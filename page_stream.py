@@ -0,0 +1,202 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+class PageStream:
+    """Iterates over the items of a paginated Toornament endpoint and requests the pages only as they are consumed.
+    More infos about pagination: https://developer.toornament.com/v2/overview/pagination
+
+    Breaking out of the iteration (or reaching the limit) means later pages are never requested.
+    total is the total number of items reported by the API in the Content-Range header. It's known once the first page was received.
+    """
+
+    def __init__(self, fetch_page, items_per_request: int = 50, limit: int = None, prefetch: bool = False, max_workers: int = 10):
+        """fetch_page:        Function that requests the items from a start to an end index (inclusive).
+                           Returns a tuple of the page's items and its parsed Content-Range (None if the page is empty).
+        items_per_request: How many items can be requested per page. Consult toornament API documentation to get the right number for your API endpoint.
+        limit:             Maximum number of items to return, None for all items.
+        prefetch:          If True, all remaining pages are requested concurrently once the total is known, instead of one after another.
+        max_workers:       Maximum number of pages requested at the same time when prefetching (only used by the blocking stream).
+        """
+        self._fetch_page = fetch_page
+        self._items_per_request = items_per_request
+        self._limit = limit
+        self._prefetch = prefetch
+        self._max_workers = max_workers
+
+        self.total = None
+
+    def _first_page_range(self):
+        "Returns the item range of the first page."
+
+        if self._limit is None:
+            return 0, self._items_per_request - 1
+
+        return 0, min(self._items_per_request, self._limit) - 1
+
+    def _end(self, content_range):
+        "Returns the index after the last item that should be requested, given the parsed Content-Range of the latest page."
+
+        if self._limit is None:
+            return content_range[2]
+
+        return min(content_range[2], self._limit)
+
+    def _remaining_page_ranges(self, content_range):
+        """Returns the (start, end) item ranges of all pages following the page with the given parsed Content-Range.
+        If the API returned fewer items than requested, its page size is used for the remaining pages.
+        """
+
+        first_index, last_index, _ = content_range
+        page_size = min(self._items_per_request, last_index - first_index + 1)
+        end = self._end(content_range)
+
+        return [(page_start, min(page_start + page_size, end) - 1) for page_start in range(last_index + 1, end, page_size)]
+
+    def _received(self, page, content_range):
+        "Updates the total number of items after the first page was received."
+
+        if self.total is None:
+            self.total = len(page) if content_range is None else content_range[2]
+
+    def _truncate(self, page, item_num: int):
+        "Cuts off the items of a page that exceed the limit, given how many items were already returned."
+
+        if self._limit is None:
+            return page
+
+        return page[:max(self._limit - item_num, 0)]
+
+    def __iter__(self):
+        item_num = 0
+
+        for page in self.__pages():
+            page = self._truncate(page, item_num)
+            item_num += len(page)
+
+            yield from page
+
+            if self._limit is not None and item_num >= self._limit:
+                return
+
+    def __pages(self):
+        "Requests the pages one by one (or all at once when prefetching) and yields them."
+
+        if self._limit == 0:
+            self.total = 0
+            return
+
+        # The first page tells how many items there are in total
+        page, content_range = self._fetch_page(*self._first_page_range())
+        self._received(page, content_range)
+        yield page
+
+        # If no content is returned, there are no further pages
+        if content_range is None:
+            return
+
+        page_ranges = self._remaining_page_ranges(content_range)
+
+        if self._prefetch and len(page_ranges) > 1:
+            # Fetches all remaining pages at once and keeps them in order
+            executor = ThreadPoolExecutor(max_workers = min(len(page_ranges), self._max_workers))
+            futures = [executor.submit(self._fetch_page, *page_range) for page_range in page_ranges]
+
+            try:
+                for future in futures:
+                    yield future.result()[0]
+            finally:
+                for future in futures:
+                    future.cancel()
+
+                executor.shutdown(wait = False)
+
+            return
+
+        # Fetches the remaining pages one after another
+        page_start = content_range[1] + 1
+        end = self._end(content_range)
+
+        while page_start < end:
+            page, content_range = self._fetch_page(page_start, min(page_start + self._items_per_request, end) - 1)
+            yield page
+
+            # If no content is returned, leave the loop
+            if content_range is None:
+                break
+
+            # Calculates which is the next page to be retrieved
+            page_start = content_range[1] + 1
+            end = self._end(content_range)
+
+
+class AsyncPageStream(PageStream):
+    """Asynchronous variant of PageStream, to be used with 'async for'.
+    fetch_page must be a coroutine function. Prefetched pages are requested as concurrent tasks.
+    """
+
+    def __aiter__(self):
+        return self.__items()
+
+    async def __items(self):
+        item_num = 0
+
+        async for page in self.__pages():
+            page = self._truncate(page, item_num)
+            item_num += len(page)
+
+            for item in page:
+                yield item
+
+            if self._limit is not None and item_num >= self._limit:
+                return
+
+    async def __pages(self):
+        "Requests the pages one by one (or all at once when prefetching) and yields them."
+
+        if self._limit == 0:
+            self.total = 0
+            return
+
+        # The first page tells how many items there are in total
+        page, content_range = await self._fetch_page(*self._first_page_range())
+        self._received(page, content_range)
+        yield page
+
+        # If no content is returned, there are no further pages
+        if content_range is None:
+            return
+
+        page_ranges = self._remaining_page_ranges(content_range)
+
+        if self._prefetch and len(page_ranges) > 1:
+            # Fetches all remaining pages at once and keeps them in order
+            tasks = [asyncio.ensure_future(self._fetch_page(*page_range)) for page_range in page_ranges]
+
+            try:
+                for task in tasks:
+                    yield (await task)[0]
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+            return
+
+        # Fetches the remaining pages one after another
+        page_start = content_range[1] + 1
+        end = self._end(content_range)
+
+        while page_start < end:
+            page, content_range = await self._fetch_page(page_start, min(page_start + self._items_per_request, end) - 1)
+            yield page
+
+            # If no content is returned, leave the loop
+            if content_range is None:
+                break
+
+            # Calculates which is the next page to be retrieved
+            page_start = content_range[1] + 1
+            end = self._end(content_range)
+
+    async def to_list(self):
+        "Requests all pages and returns their items as one list."
+        return [item async for item in self]
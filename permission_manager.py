@@ -1,4 +1,4 @@
-from persistent_json import JSONStorage
+from persistent_sqlite import SQLiteStorage
 
 import discord
 from discord.ext import commands
@@ -6,34 +6,55 @@ from discord.ext import commands
 class PermissionManager:
 
     def __init__(self):
-        self.__roles = JSONStorage("data/roles.json")
+        self.__roles = SQLiteStorage("data/bot.db", "roles", lambda role_info: f"{role_info['guild']}:{role_info['role']}", migrate_from = "data/roles.json")
+
+        # Index of guild ID to the IDs of all roles with permissions in that guild
+        self.__guild_roles = {}
+
+        for role_info in self.__roles.records():
+            self.__guild_roles.setdefault(role_info["guild"], set()).add(role_info["role"])
 
     def add_role(self, role: discord.Role):
         role_info = {
             "guild": role.guild.id,
             "role": role.id
         }
-        self.__roles.content += [role_info]
-        self.__roles.save()
+
+        self.__guild_roles.setdefault(role.guild.id, set()).add(role.id)
+        self.__roles.put(role_info)
 
     def remove_role(self, role: discord.Role):
+        self.__remove_role_id(role.guild.id, role.id)
+
+    def __remove_role_id(self, guild_id: int, role_id: int):
+        role_info = {
+            "guild": guild_id,
+            "role": role_id
+        }
+
+        self.__guild_roles.get(guild_id, set()).discard(role_id)
+        self.__roles.delete(role_info)
 
-        roles = []
+    def remove_deleted_roles(self, guild: discord.Guild):
+        "Removes the permissions of all roles that no longer exist in a guild."
 
-        for perm_role in self.__roles.content:
-            if not perm_role["guild"] == role.guild.id or not perm_role["role"] == role.id:
-                roles += [perm_role]
+        existing_role_ids = {role.id for role in guild.roles}
 
-        self.__roles.content = roles
-        self.__roles.save()
+        for role_id in self.__guild_roles.get(guild.id, set()) - existing_role_ids:
+            self.__remove_role_id(guild.id, role_id)
 
     def has_perms(self, ctx: commands.Context):
 
         if ctx.author.permissions_in(ctx.channel).administrator:
             return True
 
-        for member_role in ctx.author.roles:
-            for perm_role in self.__roles.content:
-                if member_role.guild.id == perm_role["guild"] and member_role.id == perm_role["role"]:
-                    return True
-        return False
\ No newline at end of file
+        # Users outside of guilds (e.g. in DMs) don't have roles
+        if ctx.guild is None:
+            return False
+
+        perm_role_ids = self.__guild_roles.get(ctx.guild.id)
+
+        if not perm_role_ids:
+            return False
+
+        return not perm_role_ids.isdisjoint(member_role.id for member_role in ctx.author.roles)
@@ -1,23 +1,28 @@
-import json
+import fast_json
+import os
 
 class JSONStorage:
-    "This class manages a JSON-array and adds methods to save it to a persistent file."
+    """This class loads a JSON-array from a file written by older versions of the bot.
+    The bot keeps its records in SQLiteStorage, which imports these files with this class.
+    """
 
     def __init__(self, location: str):
-        "location: Path to the JSON-file to load and save in."
+        "location: Path to the JSON-file to load."
         self.__location = location
         self.content = []
         self.__load()
 
-    def save(self):
-        "Saves the content of this storage to the given JSON-file."
-        with open(self.__location, 'w', encoding='utf-8') as storage_file:
-            json.dump(self.content, storage_file, indent=2)
-
     def __load(self):
-        "Tries to load the content of this storage from the given JSON-file."
+        """Tries to load the content of this storage from the given JSON-file.
+        If the file is unreadable, it's moved aside to '<file>.corrupt', so it isn't imported again but is kept for inspection.
+        """
         try:
-            with open(self.__location, 'r', encoding='utf-8') as storage_file:
-                self.content = json.load(storage_file)
-        except:
+            with open(self.__location, 'rb') as storage_file:
+                self.content = fast_json.loads(storage_file.read())
+        except FileNotFoundError:
             pass
+        except ValueError as error:
+            corrupt_location = f"{self.__location}.corrupt"
+            os.replace(self.__location, corrupt_location)
+            print(f"Couldn't load '{self.__location}', moved it to '{corrupt_location}': {error}")
+
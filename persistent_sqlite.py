@@ -0,0 +1,85 @@
+from persistent_json import JSONStorage
+
+import fast_json
+import os
+import sqlite3
+
+class SQLiteStorage:
+    """Stores records as JSON in a table of an SQLite database.
+    Every change is a single transaction on one row, so updates are atomic and don't rewrite the other records.
+    """
+
+    def __init__(self, location: str, table: str, key, migrate_from: str = None):
+        """location:     Path to the SQLite database file. Several storages can share one database with different tables.
+        table:        Name of the table holding the records.
+        key:          Function that returns the unique key of a record.
+        migrate_from: Path to a JSON-file of a JSONStorage. If the table is still empty, its records are imported
+                      and the file is renamed to '<file>.migrated'.
+        """
+        self.__table = table
+        self.__key = key
+
+        directory = os.path.dirname(location)
+
+        if directory:
+            os.makedirs(directory, exist_ok = True)
+
+        self.__connection = sqlite3.connect(location)
+
+        with self.__connection:
+            self.__connection.execute(f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, record TEXT NOT NULL)")
+
+        if migrate_from is not None:
+            self.__migrate(migrate_from)
+
+    def __migrate(self, json_location: str):
+        "Imports the records of a JSON-file written by JSONStorage if this storage is still empty."
+
+        if not os.path.exists(json_location):
+            return
+
+        if self.__connection.execute(f"SELECT COUNT(*) FROM {self.__table}").fetchone()[0] > 0:
+            return
+
+        # An unreadable file is moved aside to '<file>.corrupt' by JSONStorage and nothing is imported
+        records = JSONStorage(json_location).content
+
+        if not os.path.exists(json_location):
+            return
+
+        # Records with a duplicate key are skipped, so the first one is kept
+        with self.__connection:
+            self.__connection.executemany(
+                f"INSERT OR IGNORE INTO {self.__table} (key, record) VALUES (?, ?)",
+                [(self.__key(record), fast_json.dumps(record)) for record in records]
+            )
+
+        os.replace(json_location, f"{json_location}.migrated")
+
+
+    ### RECORDS ###
+
+    def records(self):
+        "Returns all records in the order they were added."
+
+        rows = self.__connection.execute(f"SELECT record FROM {self.__table} ORDER BY rowid")
+        return [fast_json.loads(record) for record, in rows]
+
+    def put(self, record):
+        "Adds a record or replaces the record with the same key."
+
+        with self.__connection:
+            self.__connection.execute(
+                f"INSERT INTO {self.__table} (key, record) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET record = excluded.record",
+                (self.__key(record), fast_json.dumps(record))
+            )
+
+    def delete(self, record):
+        "Removes the record with the same key as the given one."
+
+        with self.__connection:
+            self.__connection.execute(f"DELETE FROM {self.__table} WHERE key = ?", (self.__key(record),))
+
+    def close(self):
+        "Closes the database connection."
+        self.__connection.close()
@@ -0,0 +1,188 @@
+import asyncio
+import metrics
+import threading
+import time
+
+# Seconds requests waited for the rate limiter, see metrics.py
+wait_seconds = metrics.registry.histogram("toornament_rate_limit_wait_seconds", "Seconds requests waited for the rate limiter, by API scope.", buckets = (0, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+
+class TokenBucket:
+    """Token bucket that allows bursts of up to `burst` requests and refills at `rate` requests per second.
+    Waiting times are handed out as reservations, so the same bucket paces threads and coroutines alike.
+    The rate and burst are only defaults: Once the server reports its limits, they're derived from them, both up and down.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        """rate:  Number of tokens refilled per second.
+        burst: Maximum number of tokens the bucket can hold, i.e. how many requests may be sent at once.
+        """
+        self.rate = rate
+        self.burst = burst
+
+        self.__tokens = float(burst)
+        # Length of the server's rate limit window, estimated as the longest time until a reset it reported
+        self.__window = None
+        # Time from which tokens accumulate. It lies in the future while the bucket is blocked by the server.
+        self.__last_refill = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def __refill(self, now: float):
+        "Adds the tokens that accumulated since the last refill. Nothing accumulates while the bucket is blocked."
+
+        if now > self.__last_refill:
+            self.__tokens = min(self.burst, self.__tokens + (now - self.__last_refill) * self.rate)
+            self.__last_refill = now
+
+    def __block(self, until: float):
+        "Blocks the bucket until the given time. Tokens only start to accumulate again afterwards."
+        self.__last_refill = max(self.__last_refill, until)
+
+    def reserve(self) -> float:
+        "Takes a token and returns how many seconds the caller has to wait before it may send its request."
+
+        with self.__lock:
+            now = time.monotonic()
+            self.__refill(now)
+
+            # Tokens may become negative: Each waiting caller is queued behind the ones that reserved before it.
+            # While the bucket is blocked, the queue starts when the block ends, so the queued callers are paced instead of sent at once.
+            self.__tokens -= 1
+            wait = 0.0 if self.__tokens >= 0 else -self.__tokens / self.rate
+
+            return max(self.__last_refill - now, 0.0) + wait
+
+    def acquire(self) -> float:
+        "Blocks until a request may be sent. Returns how many seconds it waited."
+
+        wait = self.reserve()
+
+        if wait > 0:
+            time.sleep(wait)
+
+        return max(wait, 0.0)
+
+    async def acquire_async(self) -> float:
+        "Waits without blocking the event loop until a request may be sent. Returns how many seconds it waited."
+
+        wait = self.reserve()
+
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        return max(wait, 0.0)
+
+    def update(self, limit: int = None, remaining: int = None, reset_in: float = None, retry_after: float = None):
+        """Adapts the bucket to the limits reported by the server.
+
+        limit:       Maximum number of requests the server allows per window. Becomes the burst size, and together with the
+                     window length (estimated from reset_in) sets the rate to limit / window.
+        remaining:   Number of requests the server still allows in the current window. Caps the available tokens.
+        reset_in:    Seconds until the current window resets. Blocks the bucket until then if nothing is remaining.
+        retry_after: Seconds the server asked to wait before the next request. Blocks the bucket until then.
+        """
+
+        with self.__lock:
+            now = time.monotonic()
+            self.__refill(now)
+
+            if limit is not None and limit > 0:
+                # A response sent right after a reset shows the whole window, later ones only its rest
+                if reset_in is not None and reset_in > 0:
+                    self.__window = max(self.__window or 0.0, reset_in)
+
+                if self.__window is not None:
+                    self.rate = limit / self.__window
+
+                self.burst = max(int(limit), 1)
+                self.__tokens = min(self.__tokens, self.burst)
+
+            if remaining is not None:
+                self.__tokens = min(self.__tokens, remaining)
+
+                if remaining <= 0 and reset_in is not None:
+                    self.__block(now + reset_in)
+
+            if retry_after is not None:
+                self.__tokens = min(self.__tokens, 0.0)
+                self.__block(now + retry_after)
+
+
+class RateLimiter:
+    """Collection of token buckets, one per API scope (e.g. viewer, organizer and oauth).
+    A single process-wide instance is returned by RateLimiter.shared(), so several API clients don't add up their rates.
+    """
+
+    # Default (rate, burst) per scope
+    default_limits = {
+        "viewer": (3.0, 6),
+        "organizer": (3.0, 6),
+        "oauth": (1.0, 2)
+    }
+
+    __shared = None
+    __shared_lock = threading.Lock()
+
+    def __init__(self, limits: dict = None):
+        """limits: Dictionary of scope name to a (rate, burst) tuple or a TokenBucket. Scopes that aren't given use default_limits."""
+
+        limits = dict(self.default_limits, **(limits or {}))
+        self.__buckets = {}
+
+        for scope, limit in limits.items():
+            self.__buckets[scope] = limit if isinstance(limit, TokenBucket) else TokenBucket(*limit)
+
+    @classmethod
+    def shared(cls):
+        "Returns the process-wide rate limiter and creates it with the default limits if necessary."
+
+        with cls.__shared_lock:
+            if cls.__shared is None:
+                cls.__shared = cls()
+
+            return cls.__shared
+
+    def bucket(self, scope: str) -> TokenBucket:
+        "Returns the token bucket of a scope. Unknown scopes get their own bucket with the viewer limits."
+
+        if scope not in self.__buckets:
+            self.__buckets[scope] = TokenBucket(*self.default_limits["viewer"])
+
+        return self.__buckets[scope]
+
+    def acquire(self, scope: str):
+        "Blocks until a request of the given scope may be sent."
+        wait_seconds.observe(self.bucket(scope).acquire(), scope = scope)
+
+    async def acquire_async(self, scope: str):
+        "Waits without blocking the event loop until a request of the given scope may be sent."
+        wait_seconds.observe(await self.bucket(scope).acquire_async(), scope = scope)
+
+    def update_from_headers(self, scope: str, headers):
+        """Adapts the bucket of a scope to the X-RateLimit-* and Retry-After headers of a response.
+        X-RateLimit-Reset is accepted both as seconds until the reset and as a Unix timestamp.
+        """
+
+        limit = self.__parse_number(headers.get('X-RateLimit-Limit'))
+        remaining = self.__parse_number(headers.get('X-RateLimit-Remaining'))
+        reset = self.__parse_number(headers.get('X-RateLimit-Reset'))
+        retry_after = self.__parse_number(headers.get('Retry-After'))
+
+        if limit is None and remaining is None and retry_after is None:
+            return
+
+        # Large reset values are timestamps rather than durations
+        if reset is not None and reset > 1e9:
+            reset = reset - time.time()
+
+        self.bucket(scope).update(limit, remaining, reset, retry_after)
+
+    def __parse_number(self, value):
+        "Converts a header value into a number, or None if it's missing or not numeric (e.g. an HTTP date)."
+
+        if value is None:
+            return None
+
+        try:
+            return float(value)
+        except ValueError:
+            return None
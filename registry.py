@@ -0,0 +1,188 @@
+class Registry:
+    """Records of a storage (e.g. SQLiteStorage) with hash indexes for constant time lookups.
+    Every entry belongs to the namespace of a guild. Entries without a guild (e.g. ones stored before namespaces existed)
+    belong to the global namespace and are visible in every guild. Unique keys can only be used once within a namespace,
+    shared keys may be used by several entries, of which a lookup returns the first one.
+    """
+
+    def __init__(self, storage):
+        "storage: Storage of the entries. Its key function should be the storage_key of the registry class."
+
+        self._storage = storage
+        self.__entries = {}
+        self.__index = {}
+        self.__shared_index = {}
+
+        # Indexes the stored entries. If a unique key is used twice, the first entry keeps it (as it did with linear scans).
+        # The other entry stays in the storage, it just can't be looked up until the conflict is resolved.
+        for entry in storage.records():
+            conflict = self.__conflict(entry, entry.get("guild"))
+
+            if conflict is None:
+                self.__add_to_index(entry)
+            else:
+                print(f"Skipping stored entry '{self.storage_key(entry)}' because '{conflict[1]}' is already in use.")
+
+    @staticmethod
+    def storage_key(entry):
+        "Returns the key under which an entry is stored. Must be implemented by subclasses."
+        raise NotImplementedError()
+
+    def _keys(self, entry):
+        "Returns the unique index keys of an entry as (kind, value) tuples. Must be implemented by subclasses."
+        raise NotImplementedError()
+
+    def _shared_keys(self, entry):
+        "Returns the index keys of an entry that other entries may use too, as (kind, value) tuples."
+        return []
+
+    def __add_to_index(self, entry):
+        self.__entries[self.storage_key(entry)] = entry
+
+        for key in self._keys(entry):
+            self.__index[(entry.get("guild"), key)] = entry
+
+        for key in self._shared_keys(entry):
+            self.__shared_index.setdefault((entry.get("guild"), key), []).append(entry)
+
+    def __conflict(self, entry, guild_id):
+        "Returns the key of an entry that is already used in the given namespace, or None if there is none."
+
+        for key in self._keys(entry):
+            if (guild_id, key) in self.__index:
+                return key
+
+        return None
+
+    def __find(self, keys, guild_id):
+        "Returns the first entry with one of the given keys in a single namespace, preferring unique keys over shared ones."
+
+        for key in keys:
+            entry = self.__index.get((guild_id, key))
+
+            if entry is not None:
+                return entry
+
+        for key in keys:
+            entries = self.__shared_index.get((guild_id, key))
+
+            if entries:
+                return entries[0]
+
+        return None
+
+    def _lookup(self, keys, guild_id = None):
+        "Returns the entry with one of the given index keys in the namespace of a guild, falling back to the global namespace."
+
+        entry = self.__find(keys, guild_id)
+
+        if entry is None and guild_id is not None:
+            entry = self.__find(keys, None)
+
+        return entry
+
+    def _add(self, entry, guild_id = None):
+        "Adds an entry to the namespace of a guild. Raises a ValueError if one of its keys is already in use there."
+
+        entry["guild"] = guild_id
+        conflict = self.__conflict(entry, guild_id)
+
+        if conflict is not None:
+            raise ValueError(f"'{conflict[1]}' is already in use.")
+
+        self.__add_to_index(entry)
+        self._storage.put(entry)
+
+    def _remove(self, entry):
+        "Removes an entry and all of its index keys."
+
+        for key in self._keys(entry):
+            self.__index.pop((entry.get("guild"), key), None)
+
+        for key in self._shared_keys(entry):
+            entries = [other for other in self.__shared_index.get((entry.get("guild"), key), []) if other is not entry]
+
+            if entries:
+                self.__shared_index[(entry.get("guild"), key)] = entries
+            else:
+                self.__shared_index.pop((entry.get("guild"), key), None)
+
+        del self.__entries[self.storage_key(entry)]
+        self._storage.delete(entry)
+
+    def __iter__(self):
+        return iter(list(self.__entries.values()))
+
+    def __len__(self):
+        return len(self.__entries)
+
+
+class StageRegistry(Registry):
+    "Registered stages, indexed by their unique alias and by group name and group ID, which several stages may share."
+
+    @staticmethod
+    def storage_key(stage):
+        return f"{stage.get('guild')}:{stage['alias'].lower()}"
+
+    def _keys(self, stage):
+        return [("alias", stage["alias"].lower())]
+
+    def _shared_keys(self, stage):
+        return [
+            ("group_name", stage["group"]["name"].lower()),
+            ("group_id", stage["group"]["id"])
+        ]
+
+    def add(self, stage, guild_id = None):
+        "Registers a stage in the namespace of a guild. Raises a ValueError if its alias is already used."
+        self._add(stage, guild_id)
+
+    def get(self, stage_name: str, guild_id = None):
+        """Returns the stage with the given alias or group name (case-insensitive), or None if there is none.
+        Aliases take precedence. If several stages have a group with this name, the first one added is returned.
+        """
+        stage_name = stage_name.lower()
+        return self._lookup([("alias", stage_name), ("group_name", stage_name)], guild_id)
+
+    def get_by_group_id(self, group_id, guild_id = None):
+        "Returns the first stage of a Toornament group, or None if the group wasn't added."
+        return self._lookup([("group_id", group_id)], guild_id)
+
+    def remove(self, stage_name: str, guild_id = None):
+        "Removes the stage with the given alias or group name. Returns the removed stage or None if there was none."
+
+        stage = self.get(stage_name, guild_id)
+
+        if stage is not None:
+            self._remove(stage)
+
+        return stage
+
+
+class SequenceRegistry(Registry):
+    "Registered sequences, indexed by alias."
+
+    @staticmethod
+    def storage_key(sequence):
+        return f"{sequence.get('guild')}:{sequence['alias'].lower()}"
+
+    def _keys(self, sequence):
+        return [("alias", sequence["alias"].lower())]
+
+    def add(self, sequence, guild_id = None):
+        "Registers a sequence in the namespace of a guild. Raises a ValueError if its alias is already used."
+        self._add(sequence, guild_id)
+
+    def get(self, sequence_name: str, guild_id = None):
+        "Returns the sequence with the given alias (case-insensitive), or None if there is none."
+        return self._lookup([("alias", sequence_name.lower())], guild_id)
+
+    def remove(self, sequence_name: str, guild_id = None):
+        "Removes the sequence with the given alias. Returns the removed sequence or None if there was none."
+
+        sequence = self.get(sequence_name, guild_id)
+
+        if sequence is not None:
+            self._remove(sequence)
+
+        return sequence
@@ -0,0 +1,292 @@
+import fast_json
+import metrics
+import models
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Cache metrics, see metrics.py
+cache_requests = metrics.registry.counter("toornament_cache_requests_total", "Lookups in the Toornament response cache by endpoint and result (hit, stale or miss).")
+conditional_responses = metrics.registry.counter("toornament_conditional_responses_total", "Toornament responses that were revalidated with 304 Not Modified or downloaded in full.")
+
+class StaleResult(list):
+    "A cached list of ranking items or matches that is past its time-to-live. A fresh one is requested in the background."
+
+
+class ResponseCache:
+    """Bounded LRU cache for Toornament API responses with a time-to-live per endpoint.
+    Entries are stored under an endpoint name (e.g. "ranking") and a hashable key made from the request parameters.
+    Expired entries are kept for up to max_stale seconds, so they can still be served while the API is slow or down.
+    The cache can be saved to a snapshot file and loaded again, so a restarted bot doesn't have to refetch everything.
+    """
+
+    snapshot_version = 1
+
+    # Metric label of each counter of stats()
+    result_labels = {"hits": "hit", "stale": "stale", "misses": "miss"}
+
+    # Default time-to-live in seconds per endpoint
+    default_ttls = {
+        "tournament": 3600,
+        "stage": 3600,
+        "groups": 600,
+        "ranking": 60,
+        "matches": 60
+    }
+
+    def __init__(self, max_entries: int = 512, ttls: dict = None, max_stale: float = 86400):
+        """max_entries: Maximum number of cached responses. The least recently used one is dropped when it's exceeded.
+        ttls:        Dictionary of endpoint name to time-to-live in seconds. Endpoints that aren't given use default_ttls.
+        max_stale:   Seconds an entry may still be served by lookup() after its time-to-live ran out. 0 never serves stale entries.
+        """
+        self.max_entries = max_entries
+        self.ttls = dict(self.default_ttls, **(ttls or {}))
+        self.max_stale = max_stale
+
+        self.__entries = OrderedDict()
+        self.__stats = {}
+        self.__lock = threading.Lock()
+
+    def __count(self, endpoint: str, counter: str):
+        "Increments a hit/stale/miss counter of an endpoint."
+
+        if endpoint not in self.__stats:
+            self.__stats[endpoint] = {counter: 0 for counter in self.result_labels}
+
+        self.__stats[endpoint][counter] += 1
+        cache_requests.inc(endpoint = endpoint, result = self.result_labels[counter])
+
+    def get(self, endpoint: str, key):
+        "Returns the cached response for a request or None if there is no fresh one."
+
+        with self.__lock:
+            entry = self.__entries.get((endpoint, key))
+
+            if entry is None or entry[2] < time.time():
+                self.__count(endpoint, "misses")
+                return None
+
+            self.__entries.move_to_end((endpoint, key))
+            self.__count(endpoint, "hits")
+            return entry[0]
+
+    def lookup(self, endpoint: str, key):
+        """Returns a tuple of the cached response for a request and whether it's stale, i.e. past its time-to-live.
+        Stale responses are returned for up to max_stale seconds after they expired. Returns (None, False) if there is no usable response.
+        """
+
+        with self.__lock:
+            entry = self.__entries.get((endpoint, key))
+            now = time.time()
+
+            if entry is None or entry[2] + self.max_stale < now:
+                self.__count(endpoint, "misses")
+                return None, False
+
+            stale = entry[2] < now
+
+            self.__entries.move_to_end((endpoint, key))
+            self.__count(endpoint, "stale" if stale else "hits")
+            return entry[0], stale
+
+    def put(self, endpoint: str, key, value):
+        "Caches the response of a request for the time-to-live of its endpoint."
+
+        with self.__lock:
+            stored_at = time.time()
+
+            self.__entries[(endpoint, key)] = (value, stored_at, stored_at + self.ttls.get(endpoint, 60))
+            self.__entries.move_to_end((endpoint, key))
+
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last = False)
+
+    def invalidate(self, endpoint: str = None, key = None):
+        """Removes cached responses.
+        Without arguments the whole cache is cleared, with only an endpoint all responses of this endpoint are removed.
+        """
+
+        with self.__lock:
+            if endpoint is None:
+                self.__entries.clear()
+            elif key is not None:
+                self.__entries.pop((endpoint, key), None)
+            else:
+                for entry_key in [entry_key for entry_key in self.__entries if entry_key[0] == endpoint]:
+                    del self.__entries[entry_key]
+
+    def stats(self):
+        "Returns a dictionary of endpoint name to its hit, stale and miss counts, plus the totals under 'total'."
+
+        with self.__lock:
+            stats = {endpoint: dict(counters) for endpoint, counters in self.__stats.items()}
+
+        stats["total"] = {counter: sum(counters[counter] for counters in stats.values()) for counter in self.result_labels}
+        return stats
+
+    def __len__(self):
+        return len(self.__entries)
+
+
+    ### SNAPSHOTS ###
+
+    def save(self, location: str):
+        """Saves all entries that can still be served with the time they were cached to a compact JSON-file.
+        The snapshot is written to a temporary file first, which then replaces the old one, so a crash mid-write can't corrupt it.
+        """
+
+        now = time.time()
+
+        with self.__lock:
+            entries = [(endpoint, key, value, stored_at) for (endpoint, key), (value, stored_at, expiry) in self.__entries.items() if expiry + self.max_stale >= now]
+
+        snapshot = {
+            "version": self.snapshot_version,
+            "entries": [[endpoint, key, stored_at, models.model_name(value), value] for endpoint, key, value, stored_at in entries]
+        }
+
+        temp_location = f"{location}.tmp"
+
+        with open(temp_location, 'w', encoding='utf-8') as snapshot_file:
+            snapshot_file.write(fast_json.dumps(snapshot, default = models.to_json))
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+
+        os.replace(temp_location, location)
+
+    def load(self, location: str):
+        """Loads the entries of a snapshot that can still be served and returns how many were loaded.
+        Expiry times are recalculated with the current time-to-live of each endpoint, so lowered TTLs apply to loaded entries too.
+        A missing or unreadable snapshot is ignored, the cache then simply starts empty.
+        """
+
+        try:
+            with open(location, 'rb') as snapshot_file:
+                snapshot = fast_json.loads(snapshot_file.read())
+        except FileNotFoundError:
+            return 0
+        except ValueError as error:
+            print(f"Couldn't load the cache snapshot '{location}': {error}")
+            return 0
+
+        if not isinstance(snapshot, dict) or snapshot.get("version") != self.snapshot_version:
+            print(f"Ignoring the cache snapshot '{location}' because its format is outdated.")
+            return 0
+
+        now = time.time()
+        loaded = 0
+
+        with self.__lock:
+            # Entries were saved from least to most recently used, so the LRU order is kept
+            for endpoint, key, stored_at, model_name, data in snapshot["entries"]:
+                expiry = stored_at + self.ttls.get(endpoint, 60)
+
+                if expiry + self.max_stale < now:
+                    continue
+
+                try:
+                    value = models.restore(model_name, data)
+                except (KeyError, TypeError) as error:
+                    print(f"Skipping an unreadable {endpoint} entry of the cache snapshot: {error}")
+                    continue
+
+                self.__entries[(endpoint, self.__to_key(key))] = (value, stored_at, expiry)
+                loaded += 1
+
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last = False)
+
+        return loaded
+
+    def __to_key(self, key):
+        "Turns the JSON lists of a loaded key back into the tuples it was made of."
+
+        if isinstance(key, list):
+            return tuple(self.__to_key(part) for part in key)
+
+        return key
+
+
+class ConditionalStore:
+    """Remembers the validators (ETag and Last-Modified) and payloads of API responses so that requests can be sent conditionally.
+    If the API answers a conditional request with 304 Not Modified, the stored payload is reused instead of downloading it again.
+    Entries are stored per URL and Range header, so every page of a paginated request is validated on its own.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        "max_entries: Maximum number of stored responses. The least recently used one is dropped when it's exceeded."
+        self.max_entries = max_entries
+
+        self.__entries = OrderedDict()
+        self.__stats = {"revalidated": 0, "downloaded": 0}
+        self.__lock = threading.Lock()
+
+    def conditional_headers(self, url: str, range_header: str = None):
+        "Returns the If-None-Match and If-Modified-Since headers for a request, or an empty dictionary if nothing is stored for it."
+
+        with self.__lock:
+            entry = self.__entries.get((url, range_header))
+
+        if entry is None:
+            return {}
+
+        headers = {}
+
+        if entry["etag"] is not None:
+            headers['If-None-Match'] = entry["etag"]
+
+        if entry["last_modified"] is not None:
+            headers['If-Modified-Since'] = entry["last_modified"]
+
+        return headers
+
+    def revalidated(self, url: str, range_header: str = None):
+        """Returns a tuple of the stored payload and Content-Range header of a request the API answered with 304 Not Modified.
+        Returns None if nothing is stored for the request.
+        """
+
+        with self.__lock:
+            entry = self.__entries.get((url, range_header))
+
+            if entry is None:
+                return None
+
+            self.__entries.move_to_end((url, range_header))
+            self.__stats["revalidated"] += 1
+            conditional_responses.inc(result = "revalidated")
+            return entry["payload"], entry["content_range"]
+
+    def update(self, url: str, range_header: str, response_headers, payload, content_range: str = None):
+        "Stores the payload of a downloaded response if the API sent validators for it."
+
+        etag = response_headers.get('ETag')
+        last_modified = response_headers.get('Last-Modified')
+
+        with self.__lock:
+            self.__stats["downloaded"] += 1
+            conditional_responses.inc(result = "downloaded")
+
+            if etag is None and last_modified is None:
+                self.__entries.pop((url, range_header), None)
+                return
+
+            self.__entries[(url, range_header)] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "payload": payload,
+                "content_range": content_range
+            }
+            self.__entries.move_to_end((url, range_header))
+
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last = False)
+
+    def stats(self):
+        "Returns how many responses were revalidated with 304 Not Modified and how many were downloaded in full."
+
+        with self.__lock:
+            return dict(self.__stats)
+
+    def __len__(self):
+        return len(self.__entries)
@@ -0,0 +1,74 @@
+import asyncio
+import metrics
+import threading
+from concurrent.futures import Future
+
+# Number of calls that were answered by an identical call already in flight, see metrics.py
+coalesced_calls = metrics.registry.counter("single_flight_coalesced_total", "Calls that awaited an identical call already in flight instead of running on their own.")
+
+class SingleFlight:
+    """Coalesces identical concurrent calls from several threads.
+    While a call with a key is running, other calls with the same key wait for it and receive its result (or exception) instead of running themselves.
+    """
+
+    def __init__(self):
+        self.__calls = {}
+        self.__lock = threading.Lock()
+
+    def do(self, key, function):
+        """Calls a function without arguments, unless a call with the same key is already running, and returns its result.
+
+        key:      Hashable key identifying identical calls, e.g. made from the URL and query of a request.
+        function: Function that performs the call.
+        """
+
+        with self.__lock:
+            future = self.__calls.get(key)
+            leader = future is None
+
+            if leader:
+                future = Future()
+                self.__calls[key] = future
+
+        if not leader:
+            coalesced_calls.inc()
+            return future.result()
+
+        try:
+            result = function()
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.__lock:
+                del self.__calls[key]
+
+
+class AsyncSingleFlight:
+    """Coalesces identical concurrent calls of coroutines, the asynchronous variant of SingleFlight.
+    The shared call runs as its own task, so a cancelled caller doesn't cancel it for the others.
+    """
+
+    def __init__(self):
+        self.__calls = {}
+
+    async def do(self, key, coroutine_function):
+        """Awaits a coroutine function without arguments, unless a call with the same key is already running, and returns its result.
+
+        key:                Hashable key identifying identical calls, e.g. made from the URL and query of a request.
+        coroutine_function: Coroutine function that performs the call.
+        """
+
+        task = self.__calls.get(key)
+
+        if task is None:
+            task = asyncio.ensure_future(coroutine_function())
+            self.__calls[key] = task
+            task.add_done_callback(lambda _: self.__calls.pop(key, None))
+        else:
+            coalesced_calls.inc()
+
+        return await asyncio.shield(task)
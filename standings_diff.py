@@ -0,0 +1,99 @@
+import hashlib
+import json
+
+class StandingsDiff:
+    """Structured differences between two snapshots of the same group and week.
+
+    position_changes: List of {"team", "old", "new"} for every team whose rank changed.
+    results:          List of {"home", "away", "old", "new"} for every match whose score or status changed.
+    forfeits:         List of {"home", "away", "team"} for every match that was newly forfeited by a team.
+    """
+
+    def __init__(self, position_changes, results, forfeits):
+        self.position_changes = position_changes
+        self.results = results
+        self.forfeits = forfeits
+
+    def __bool__(self):
+        return bool(self.position_changes or self.results or self.forfeits)
+
+    def summary(self):
+        "Returns a human-readable description of the differences with one change per line."
+
+        lines  = [f"{change['team']}: {change['old']} -> {change['new']}" for change in self.position_changes]
+        lines += [f"{result['home']} vs {result['away']}: {result['old']} -> {result['new']}" for result in self.results]
+        lines += [f"{forfeit['home']} vs {forfeit['away']}: forfeit by {forfeit['team']}" for forfeit in self.forfeits]
+        return '\n'.join(lines)
+
+
+class StandingsSnapshot:
+    """Normalised ranking and fixtures of a group in a week, as returned by EmbedGenerator.get_ranking_info and get_fixture_info.
+    Two snapshots have the same fingerprint exactly if they would be rendered the same way.
+    """
+
+    def __init__(self, ranking_info, fixture_info):
+        self.ranking = ranking_info
+        self.fixtures = fixture_info
+
+        data = json.dumps([ranking_info, fixture_info], sort_keys = True)
+        self.fingerprint = hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+    def is_completed(self):
+        "Checks if all matches of the week have been completed, so their results won't change anymore."
+        return len(self.fixtures) > 0 and all(match["status"] == "completed" for match in self.fixtures)
+
+    def __match_key(self, match):
+        return (match["home_team"]["name"], match["away_team"]["name"])
+
+    def __result(self, match):
+        "Returns the result of a match as shown in the fixtures."
+
+        if match["status"] == "pending":
+            return "vs"
+
+        return f"{match['home_team']['score']}-{match['away_team']['score']}"
+
+    def __forfeiting_team(self, match):
+        "Returns the name of the team that forfeited a match, or None if nobody did."
+
+        for team in [match["home_team"], match["away_team"]]:
+            if team["score"] == "FF":
+                return team["name"]
+
+        return None
+
+    def diff(self, previous):
+        "Returns the differences of this snapshot to an earlier snapshot of the same group and week."
+
+        if previous is None or previous.fingerprint == self.fingerprint:
+            return StandingsDiff([], [], [])
+
+        # Compares the rank of every team with its previous one
+        previous_ranks = {team["name"]: team["rank"] for team in previous.ranking}
+        position_changes = [
+            {"team": team["name"], "old": previous_ranks.get(team["name"]), "new": team["rank"]}
+            for team in self.ranking if not previous_ranks.get(team["name"]) == team["rank"]
+        ]
+
+        # Compares the result of every match with its previous one
+        previous_matches = {self.__match_key(match): match for match in previous.fixtures}
+        results = []
+        forfeits = []
+
+        for match in self.fixtures:
+            previous_match = previous_matches.get(self.__match_key(match))
+            old_result = None if previous_match is None else self.__result(previous_match)
+            new_result = self.__result(match)
+
+            if old_result == new_result:
+                continue
+
+            home, away = self.__match_key(match)
+            forfeiting_team = self.__forfeiting_team(match)
+
+            if forfeiting_team is not None and (previous_match is None or self.__forfeiting_team(previous_match) is None):
+                forfeits += [{"home": home, "away": away, "team": forfeiting_team}]
+            else:
+                results += [{"home": home, "away": away, "old": old_result, "new": new_result}]
+
+        return StandingsDiff(position_changes, results, forfeits)
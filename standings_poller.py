@@ -0,0 +1,219 @@
+from embed_generator import EmbedGenerator
+from persistent_sqlite import SQLiteStorage
+from response_cache import StaleResult
+from standings_diff import StandingsSnapshot
+from toornament import AsyncToornamentAPI
+
+import asyncio
+
+import discord
+from discord.ext import commands
+
+class StandingsPoller:
+    """Keeps posted ranking&fixture embeds up-to-date.
+    Posted messages are registered with track(). In the background, the rankings and matches of all tracked groups are polled
+    on a fixed interval and the messages are edited in place whenever the data of their group changed.
+    Each group and week is polled once per interval, no matter how many messages show it,
+    and only groups whose normalised standings or fixtures changed are rendered again.
+    """
+
+    def __init__(self, bot: commands.Bot, too: AsyncToornamentAPI, embed_gen: EmbedGenerator, interval: float = 300):
+        """bot:       The bot whose posted messages are edited.
+        too:       Toornament API client used for polling.
+        embed_gen: Embed generator that renders the updated embeds and resolves the tracked stages.
+        interval:  Seconds between two polls.
+        """
+        self.__bot = bot
+        self.__too = too
+        self.__embed_gen = embed_gen
+        self.interval = interval
+
+        self.__posts = SQLiteStorage("data/bot.db", "posts", lambda post: str(post["message"]), migrate_from = "data/posts.json")
+        self.__tracked_posts = {post["message"]: post for post in self.__posts.records()}
+        self.__snapshots = {}
+        self.__task = None
+
+
+    ### TRACKED MESSAGES ###
+
+    def track(self, message: discord.Message, stage_name: str, week):
+        "Registers a posted embed of a stage and week, so that it's updated when the standings or results change."
+
+        post_info = {
+            "guild": message.guild.id,
+            "channel": message.channel.id,
+            "message": message.id,
+            "stage": stage_name.lower(),
+            "week": str(week),
+            "fingerprint": None,
+            "completed": False
+        }
+
+        self.__tracked_posts[message.id] = post_info
+        self.__posts.put(post_info)
+
+    def untrack(self, message_id: int, guild_id = None):
+        """Stops updating a posted message. Returns the removed post or None if the message isn't tracked.
+        If a guild ID is given, only messages posted in that guild are removed.
+        """
+
+        post = self.__tracked_posts.get(message_id)
+
+        if post is None or (guild_id is not None and post["guild"] != guild_id):
+            return None
+
+        del self.__tracked_posts[message_id]
+        self.__posts.delete(post)
+
+        return post
+
+
+    ### POLLING ###
+
+    def start(self):
+        "Starts polling in the background. Does nothing if the poller is already running."
+
+        if self.__task is None or self.__task.done():
+            self.__task = asyncio.ensure_future(self.__run())
+
+    def stop(self):
+        "Stops polling."
+
+        if self.__task is not None:
+            self.__task.cancel()
+            self.__task = None
+
+    async def __run(self):
+        "Polls all tracked groups until the poller is stopped."
+
+        await self.__bot.wait_until_ready()
+
+        while True:
+            try:
+                await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                print(f"Polling the standings failed: {error}")
+
+            await asyncio.sleep(self.interval)
+
+    async def poll(self):
+        """Fetches the data of all tracked groups that still have open matches and updates the messages of the groups whose data changed.
+        Returns a dictionary of (group ID, week) to the StandingsDiff of every group that changed since the last poll.
+        A group that fails to update, or whose data could only be served stale from the cache, is skipped until the next poll.
+        The other groups are still updated.
+        """
+
+        # Collects the posts of every group and week that can still change
+        tracked = {}
+
+        for post in list(self.__tracked_posts.values()):
+            stage = self.__embed_gen.get_stage(post["stage"], post["guild"])
+
+            if stage is not None and not post["completed"]:
+                tracked.setdefault((stage["group"]["id"], post["week"]), []).append((post, stage))
+
+        # Groups of the same Toornament stage and week are requested together
+        batches = {}
+
+        for posts in tracked.values():
+            group = posts[0][1]["group"]
+            batches.setdefault((group["tournament_id"], group["stage_id"]), set()).add(group["id"])
+
+        diffs = {}
+
+        for (group_id, week), posts in tracked.items():
+            group = posts[0][1]["group"]
+            group_ids = sorted(batches[(group["tournament_id"], group["stage_id"])])
+
+            try:
+                diff = await self.__poll_group(group_id, week, posts, group_ids)
+            except Exception as error:
+                print(f"Updating the standings of {group['name']} in week {week} failed: {error}")
+                continue
+
+            if diff:
+                diffs[(group_id, week)] = diff
+
+        return diffs
+
+    async def __poll_group(self, group_id, week, posts, group_ids):
+        """Fetches the data of a tracked group and week and updates its posts if it changed.
+        group_ids are the IDs of all tracked groups of the same Toornament stage, which are requested together.
+        Returns the StandingsDiff since the last poll, or None if the posts are up-to-date.
+        """
+
+        group = posts[0][1]["group"]
+
+        rankings = await self.__too.get_rankings_for_groups(group["tournament_id"], group["stage_id"], group_ids, allow_stale = False)
+        fixtures = await self.__too.get_matches_for_groups(group["tournament_id"], group["stage_id"], group_ids, week, allow_stale = False)
+
+        ranking = rankings[group["id"]]
+        matches = fixtures[group["id"]]
+
+        # The API couldn't be reached and the old data was returned instead, so the posts are left as they are until the next poll
+        if isinstance(ranking, StaleResult) or isinstance(matches, StaleResult):
+            return None
+
+        snapshot = StandingsSnapshot(self.__embed_gen.get_ranking_info(ranking), self.__embed_gen.get_fixture_info(matches))
+        previous_snapshot = self.__snapshots.get((group_id, week))
+        self.__snapshots[(group_id, week)] = snapshot
+
+        # Only groups that changed are rendered and edited
+        if all(post["fingerprint"] == snapshot.fingerprint for post, _ in posts):
+            return None
+
+        diff = snapshot.diff(previous_snapshot)
+
+        if diff:
+            print(f"Standings of {group['name']} in week {week} changed:\n{diff.summary()}")
+
+        tournament = await self.__too.get_tournament(group["tournament_id"])
+
+        for post, stage in posts:
+            if post["fingerprint"] == snapshot.fingerprint:
+                continue
+
+            # A post that fails to update keeps its old fingerprint, so it's tried again on the next poll
+            try:
+                updated = await self.__update_post(post, stage, tournament, ranking, matches)
+            except Exception as error:
+                print(f"Updating message {post['message']} failed: {error}")
+                continue
+
+            if updated:
+                post["fingerprint"] = snapshot.fingerprint
+                post["completed"] = snapshot.is_completed()
+                self.__posts.put(post)
+
+        return diff
+
+    async def __update_post(self, post, stage, tournament, ranking, matches):
+        """Renders the embed of a post with new data and edits the posted message.
+        Posts whose message was deleted or that the bot isn't allowed to access anymore are dropped.
+        Returns True if the message was updated.
+        """
+
+        guild = self.__bot.get_guild(post["guild"])
+        channel = self.__bot.get_channel(post["channel"])
+
+        if guild is None or channel is None:
+            return False
+
+        try:
+            message = await channel.fetch_message(post["message"])
+            embed = self.__embed_gen.build_embed(guild, stage, post["week"], tournament, ranking, matches)
+            await message.edit(embed = embed)
+        except discord.NotFound:
+            self.untrack(post["message"])
+            return False
+        except discord.Forbidden:
+            print(f"Stopped updating message {post['message']} because the bot isn't allowed to access it anymore.")
+            self.untrack(post["message"])
+            return False
+        except discord.HTTPException as error:
+            print(f"Updating message {post['message']} failed: {error}")
+            return False
+
+        return True
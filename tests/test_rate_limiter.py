@@ -0,0 +1,45 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from rate_limiter import TokenBucket
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_blocked_callers_are_paced_after_the_block(self):
+        "Callers that queue while the server blocks the bucket must not all be released at the end of the block."
+
+        bucket = TokenBucket(rate = 2.0, burst = 6)
+        bucket.update(retry_after = 5)
+
+        waits = [bucket.reserve() for _ in range(12)]
+
+        self.assertGreaterEqual(waits[0], 5.0)
+
+        for earlier, later in zip(waits, waits[1:]):
+            self.assertAlmostEqual(later - earlier, 1 / bucket.rate, places = 2)
+
+    def test_burst_is_not_delayed(self):
+        bucket = TokenBucket(rate = 2.0, burst = 3)
+        self.assertEqual([round(bucket.reserve(), 2) for _ in range(4)], [0.0, 0.0, 0.0, 0.5])
+
+    def test_rate_and_burst_follow_the_server_limits(self):
+        "The reported limits must be able to raise the bucket's limits as well as lower them."
+
+        bucket = TokenBucket(rate = 3.0, burst = 6)
+
+        bucket.update(limit = 2, remaining = 2, reset_in = 1)
+        self.assertEqual((bucket.rate, bucket.burst), (2.0, 2))
+
+        bucket.update(limit = 600, remaining = 599, reset_in = 60)
+        self.assertEqual((bucket.rate, bucket.burst), (10.0, 600))
+
+        # Later responses in the same window report less time until the reset, which must not speed the bucket up
+        bucket.update(limit = 600, remaining = 500, reset_in = 30)
+        self.assertEqual(bucket.rate, 10.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+
+import aiohttp
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.toornament_stub import ToornamentStub, synthetic_tournament, write_credentials
+from rate_limiter import RateLimiter, TokenBucket
+from response_cache import ResponseCache
+from toornament import AsyncToornamentAPI, ToornamentAPI
+from transport import AsyncRecordingTransport, AsyncReplayTransport, ReplayAdapter
+
+class TransportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.credentials = write_credentials(self.directory.name)
+        self.fixture_dir = os.path.join(self.directory.name, "fixtures")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def client_options(self):
+        "Disables pacing and the response cache, so every call is answered by the transport."
+        return {"rate_limiter": RateLimiter({"viewer": TokenBucket(rate = 1e9, burst = 10 ** 6)}), "cache": ResponseCache(max_entries = 0)}
+
+    async def fetch(self, too: AsyncToornamentAPI, api_url: str):
+        "Requests the data of a +group embed like the bot does."
+
+        too.api_url = api_url
+
+        async with too:
+            return await asyncio.gather(
+                too.get_tournament("1"),
+                too.get_ranking("1", "1", "1001"),
+                too.get_matches("1", "1", "1001", 2)
+            )
+
+    def test_recorded_responses_are_replayed_without_the_api(self):
+        "Responses recorded from the asynchronous client must be replayed by both clients after the API is gone."
+
+        with ToornamentStub([synthetic_tournament("1", group_num = 2, teams_per_group = 6)]) as stub:
+            api_url = stub.url
+            recorded = asyncio.run(self.fetch(AsyncToornamentAPI(self.credentials, transport = AsyncRecordingTransport(self.fixture_dir), **self.client_options()), api_url))
+
+        replayed = asyncio.run(self.fetch(AsyncToornamentAPI(self.credentials, transport = AsyncReplayTransport(self.fixture_dir), **self.client_options()), api_url))
+        self.assertEqual(replayed, recorded)
+
+        with ToornamentAPI(self.credentials, transport = ReplayAdapter(self.fixture_dir), **self.client_options()) as too:
+            too.api_url = api_url
+            self.assertEqual([too.get_tournament("1"), too.get_ranking("1", "1", "1001"), too.get_matches("1", "1", "1001", 2)], recorded)
+
+    def test_missing_fixtures_fail_like_a_connection_error(self):
+        too = AsyncToornamentAPI(self.credentials, transport = AsyncReplayTransport(self.fixture_dir), **self.client_options())
+
+        with self.assertRaises(aiohttp.ClientConnectionError):
+            asyncio.run(self.fetch(too, "http://127.0.0.1:9"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import datetime
+import json
+import os
+import threading
+
+class TokenManager:
+    """Holds the Toornament API credentials and tells when the OAuth2 authorization token has to be refreshed.
+    The token is refreshed refresh_margin before it expires, so requests only have to wait for a refresh if the token already expired
+    (e.g. because the bot was offline). Refreshed credentials are written atomically to the JSON-file they were loaded from.
+    """
+
+    expiry_format = "%d.%m.%Y, %H:%M:%S"
+
+    # A token is treated as expired this long before its expiry, to avoid expiry mid-operation
+    expiry_margin = datetime.timedelta(minutes = 1)
+
+    # A token is refreshed in the background this long before its expiry
+    refresh_margin = datetime.timedelta(minutes = 10)
+
+    def __init__(self, credential_path: str):
+        "credential_path: Path to the JSON-file with the Toornament API credentials."
+
+        self.credential_path = credential_path
+        self.__lock = threading.Lock()
+        self.credentials = self.__load()
+
+    def __load(self):
+        "Loads the Toornament API credentials from the JSON-file."
+
+        with open(self.credential_path, 'r', encoding='utf-8') as credential_file:
+            credentials = json.load(credential_file)
+
+        credentials["auth_expiry"] = datetime.datetime.strptime(credentials["auth_expiry"], self.expiry_format)
+        return credentials
+
+    def update(self, response):
+        """Takes over the token of a response of the OAuth2 endpoint and saves the credentials.
+        The credentials are replaced as a whole, so concurrent requests never see a half-updated token. The file is written
+        to a temporary file first, which then replaces the old file, so a crash mid-write can't corrupt it.
+        """
+
+        auth_expiry = datetime.datetime.now() + datetime.timedelta(seconds = response["expires_in"] - 10)
+
+        credentials = dict(self.credentials,
+            auth_key = response["access_token"],
+            auth_type = response["token_type"],
+            auth_scope = response["scope"],
+            auth_expiry = auth_expiry
+        )
+
+        with self.__lock:
+            temp_location = f"{self.credential_path}.tmp"
+
+            with open(temp_location, 'w', encoding='utf-8') as credential_file:
+                json.dump(dict(credentials, auth_expiry = auth_expiry.strftime(self.expiry_format)), credential_file, indent=2)
+                credential_file.flush()
+                os.fsync(credential_file.fileno())
+
+            os.replace(temp_location, self.credential_path)
+            self.credentials = credentials
+
+    def has_expired(self):
+        "Checks if the authorization token has expired (or is about to), so requests have to wait for a new one."
+        return datetime.datetime.now() + self.expiry_margin > self.credentials["auth_expiry"]
+
+    def needs_refresh(self):
+        "Checks if the authorization token should be refreshed in the background because it expires soon."
+        return datetime.datetime.now() + self.refresh_margin > self.credentials["auth_expiry"]
+
+    def seconds_until_refresh(self):
+        "Returns how many seconds are left until the token should be refreshed (0 if it should be refreshed now)."
+
+        refresh_time = self.credentials["auth_expiry"] - self.refresh_margin
+        return max((refresh_time - datetime.datetime.now()).total_seconds(), 0.0)
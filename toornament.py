@@ -1,117 +1,527 @@
-import datetime
-import json
+import asyncio
+import fast_json
+import metrics
 import parse
-import pause
 import requests
+import threading
 
-class ToornamentAPI:
+import aiohttp
+from circuit_breaker import CircuitBreaker
+from dataclasses import replace
+from models import Group, Match, RankingItem, Tournament, decode
+from page_stream import AsyncPageStream, PageStream
+from rate_limiter import RateLimiter
+from response_cache import ConditionalStore, ResponseCache, StaleResult
+from single_flight import AsyncSingleFlight, SingleFlight
+from token_manager import TokenManager
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Metrics of the API clients, see metrics.py
+endpoint_seconds = metrics.registry.histogram("toornament_endpoint_seconds", "Duration of the endpoint methods of the Toornament API clients, including cache hits.")
+http_requests = metrics.registry.counter("toornament_http_requests_total", "HTTP requests sent to the Toornament API by method and response status.")
+http_seconds = metrics.registry.histogram("toornament_http_request_seconds", "Duration of single HTTP requests to the Toornament API.")
+pages_fetched = metrics.registry.counter("toornament_pages_total", "Pages of paginated Toornament endpoints fetched, by range unit.")
+
+class BaseToornamentAPI:
+    "Shared state and helpers of the synchronous and asynchronous Toornament API clients."
+
+    api_url = "https://api.toornament.com"
+
+    # Response status codes after which a request is retried with exponential backoff. They count as failures for the circuit breaker.
+    retry_statuses = (429, 500, 502, 503, 504)
+
+    # Seconds a single request may take before it's aborted and counts as failed
+    request_timeout = 10.0
 
 
     # Constructor
-    # authorization: Authorization self object
-    # mysql: MySQL wrapper object
-    # overwrite: If set to True, existing tables will be dropped and overwritten
-    def __init__(self, auth_path: str):
-        self.__api_cooldown = datetime.datetime.now()
-        self.__time_per_request = 333
+    # auth_path: Path to the JSON-file with the Toornament API credentials
+    # pool_size: Maximum number of pooled keep-alive connections to the API
+    # max_retries: How often a request is retried after a 429 or 5xx response
+    # backoff_factor: Base of the exponential backoff between retries in seconds (0.5 waits 0.5s, 1s, 2s, ...)
+    # concurrent_pages: If True, all pages after the first one of a paginated request are fetched concurrently
+    # rate_limiter: RateLimiter pacing the requests. Defaults to the process-wide limiter shared by all clients.
+    # cache: ResponseCache for the endpoint methods. Defaults to a new cache with the default TTLs.
+    # circuit_breaker: CircuitBreaker that pauses all requests after repeated failures. Defaults to a new breaker with the default thresholds.
+    def __init__(self, auth_path: str, pool_size: int = 10, max_retries: int = 3, backoff_factor: float = 0.5, concurrent_pages: bool = True, rate_limiter: RateLimiter = None, cache: ResponseCache = None, circuit_breaker: CircuitBreaker = None):
+        self._rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter.shared()
+        self.cache = cache if cache is not None else ResponseCache()
+        self.circuit_breaker = circuit_breaker if circuit_breaker is not None else CircuitBreaker()
+        self._validators = ConditionalStore()
+
+        self._concurrent_pages = concurrent_pages
+        self._pool_size = pool_size
+        self._max_retries = max_retries
+        self._backoff_factor = backoff_factor
+
+        self._tokens = TokenManager(auth_path)
+
+
+    def _token_request(self):
+        """Returns URL, data and headers of a request for a new authorization token.
+        See: https://developer.toornament.com/v2/doc/security_oauth2#post:oauthv2token
+        """
+
+        request_url = f"{self.api_url}/oauth/v2/token"
+
+        request_headers = {
+            "Content-Type": "application/x-www-form-urlencoded"
+        }
+
+        request_data = {
+            "grant_type": "client_credentials",
+            "scope": "organizer:participant organizer:result",
+            "client_id": self._tokens.credentials["client_id"],
+            "client_secret": self._tokens.credentials["client_secret"]
+        }
+
+        return request_url, request_data, request_headers
+
+    def _add_api_headers(self, headers: dict, authorization: bool):
+        "Returns a copy of the given headers with the API-token and, if requested, the OAuth2 authorization token added."
+
+        headers = dict(headers)
+        credentials = self._tokens.credentials
+
+        if authorization:
+            headers['Authorization'] = credentials["auth_key"]
+
+        headers['X-Api-Key'] = credentials["token"]
+        return headers
+
+    def _parse_content_range(self, unit: str, content_range_str: str):
+        """Parses a Content-Range header of a paginated response.
+        Returns a tuple (first index, last index, total number of items) or None if the page was empty.
+        """
 
-        self.__credential_path = auth_path
-        self.__load_api_credentials()
+        if content_range_str is None:
+            return None
 
-        self.__group_buffer = {}
-        self.__tournament_buffer = {}
+        content_range_format = f"{unit} {{:d}}-{{:d}}/{{:d}}"
+        parsed_content_range = parse.parse(content_range_format, content_range_str)
 
+        if parsed_content_range is None:
+            return None
 
-    def __load_api_credentials(self):
-        "Loads the Toornament API credentials from a given JSON-file."
+        return tuple(parsed_content_range)
 
-        with open(self.__credential_path, 'r', encoding='utf-8') as token_file:
-            self.__credentials = json.load(token_file)
-            self.__credentials["auth_expiry"] = datetime.datetime.strptime(self.__credentials["auth_expiry"], "%d.%m.%Y, %H:%M:%S")
+    def request_stats(self):
+        """Returns how many endpoint calls were answered from the cache (hits), how many of them with stale responses (stale),
+        how many requests were revalidated with 304 Not Modified (revalidated) and how many responses were downloaded in full (misses).
+        """
 
-    def __update_api_credentials(self, response):
-        "Updates the local Toornament API credentials and overwrites the JSON-file they were loaded from."
+        validator_stats = self._validators.stats()
+        cache_stats = self.cache.stats()["total"]
 
-        self.__credentials["auth_key"] = response["access_token"]
-        self.__credentials["auth_type"] = response["token_type"]
-        self.__credentials["auth_scope"] = response["scope"]
+        return {
+            "hits": cache_stats["hits"] + cache_stats["stale"],
+            "stale": cache_stats["stale"],
+            "revalidated": validator_stats["revalidated"],
+            "misses": validator_stats["downloaded"]
+        }
 
-        expiry_in_seconds = response["expires_in"]
-        auth_expiry = datetime.datetime.now() + datetime.timedelta(seconds=expiry_in_seconds - 10)
-        self.__credentials["auth_expiry"] = auth_expiry.strftime("%d.%m.%Y, %H:%M:%S")
+    def _scope(self, url: str):
+        "Returns the API scope of an endpoint URL, which determines the rate limit bucket of the request."
 
-        with open(self.__credential_path, 'w', encoding='utf-8') as credential_file:
-            json.dump(self.__credentials, credential_file, indent=2)
+        if "/oauth/" in url:
+            return "oauth"
+        elif "/organizer/" in url:
+            return "organizer"
+        else:
+            return "viewer"
 
-        self.__credentials["auth_expiry"] = auth_expiry
-    
-    def __has_api_token_expired(self):
-        "Checks if the Toornament authorization token has already expired or not."
+    def _record_outcome(self, status: int):
+        "Reports the final response status of a request to the circuit breaker. Only server errors and rate limiting count as failures."
 
-        # Adds 1 minute to current time to avoid key expiry mid-operation
-        # (e.g. this method returns False but 10ms later the token expires before the API call is made)
-        if datetime.datetime.now() + datetime.timedelta(minutes = 1) > self.__credentials["auth_expiry"]:
-            return True
+        if status in self.retry_statuses:
+            self.circuit_breaker.record_failure()
         else:
-            return False
+            self.circuit_breaker.record_success()
+
+    def _request_key(self, url: str, headers: dict, authorization: bool, *options):
+        "Returns a hashable key that is equal for identical requests, made from the URL with its query, the headers and further request options."
+        return (url, tuple(sorted(headers.items())), authorization) + options
+
+    def _retry_delay(self, attempt: int, status: int, headers):
+        """Returns how many seconds to wait before retrying a request that got the given response, or None if it shouldn't be retried.
+        A Retry-After header sent by the API takes precedence over the exponential backoff.
+        """
+
+        if status not in self.retry_statuses or attempt >= self._max_retries:
+            return None
+
+        retry_after = headers.get('Retry-After')
+
+        if retry_after is not None:
+            try:
+                return max(float(retry_after), 0.0)
+            except ValueError:
+                pass
+
+        return self._backoff_factor * (2 ** attempt)
+
+
+    ### ENDPOINT URLS ###
+
+    def _ranking_url(self, tournament_id, stage_id, group_id = ""):
+        request_url  = f"{self.api_url}/viewer/v2/tournaments/{tournament_id}/stages/{stage_id}/ranking-items"
+        request_url += f"?group_ids={group_id}"
+        return request_url
+
+    def _round_numbers(self, round_nums):
+        "Returns the given round number or list of round numbers as a tuple of strings."
+
+        if not isinstance(round_nums, (list, tuple)):
+            round_nums = [round_nums]
+
+        return tuple(str(round_num) for round_num in round_nums)
+
+    def _matches_url(self, tournament_id, stage_id, group_id = "", round_nums = []):
+
+        round_nums = self._round_numbers(round_nums)
+
+        request_url  = f"{self.api_url}/viewer/v2/tournaments/{tournament_id}/matches"
+        request_url += f"?stage_ids={stage_id}&group_ids={group_id}&round_numbers={','.join(round_nums)}"
+        return request_url
+
+    def _split_by_group(self, items, group_ids):
+        "Splits ranking items or matches of several groups into a dictionary of group ID to the group's items, keeping their order."
+
+        items_by_group = {group_id: [] for group_id in group_ids}
+
+        for item in items:
+            if item.group_id in items_by_group:
+                items_by_group[item.group_id] += [item]
+
+        return items_by_group
+
+    def _groups_url(self, tournament_id):
+        return f"{self.api_url}/viewer/v2/tournaments/{tournament_id}/groups"
+
+    def _stage_url(self, tournament_id, stage_id):
+        return f"{self.api_url}/viewer/v2/tournaments/{tournament_id}/stages/{stage_id}"
+
+    def _tournament_url(self, tournament_id):
+        return f"{self.api_url}/viewer/v2/tournaments/{tournament_id}"
+
+    def _find_group(self, tournament_id, groups, group_name):
+        "Returns the group with the given name from a list of groups or None if there is none."
+
+        for group in groups:
+            if group.name == group_name:
+                return replace(group, tournament_id = tournament_id)
+
+        return None
+
+
+    ### CACHED GROUP RESULTS ###
+    # Rankings and matches are cached per group. Both clients share the cache handling below and only differ in how they request the data.
+
+    # Options of the paginated request of each group endpoint
+    group_endpoints = {
+        "ranking": {"model": RankingItem},
+        "matches": {"unit": "matches", "model": Match}
+    }
+
+    def _group_cache_key(self, endpoint: str, tournament_id, stage_id, group_id, round_nums):
+        "Returns the cache key of the ranking or matches of a group. Matches are cached per selection of round numbers."
+
+        if endpoint == "ranking":
+            return (tournament_id, stage_id, group_id)
+
+        return (tournament_id, stage_id, group_id, round_nums)
+
+    def _group_url(self, endpoint: str, tournament_id, stage_id, group_ids, round_nums):
+        "Returns the URL of the ranking or matches of the given groups of a stage."
+
+        group_ids = ','.join(str(group_id) for group_id in group_ids)
+
+        if endpoint == "ranking":
+            return self._ranking_url(tournament_id, stage_id, group_ids)
+
+        return self._matches_url(tournament_id, stage_id, group_ids, list(round_nums))
+
+    def _cache_group_result(self, endpoint: str, tournament_id, stage_id, group_id, round_nums, result, limit: int = None):
+        "Caches the ranking or matches of a group if they're complete, i.e. if there are fewer than the limit. Returns them."
+
+        if limit is None or len(result) < limit:
+            self.cache.put(endpoint, self._group_cache_key(endpoint, tournament_id, stage_id, group_id, round_nums), result)
+
+        return result
+
+    def _limit_result(self, result, limit: int, stale: bool):
+        "Returns the first items of a ranking or match list up to the limit, as StaleResult if it's stale."
+
+        result = result if limit is None else result[:limit]
+        return StaleResult(result) if stale else result
+
+    def _lookup_groups(self, endpoint: str, tournament_id, stage_id, group_ids, round_nums, allow_stale: bool = True):
+        """Looks up the rankings or matches of several groups in the cache.
+        Returns a tuple of a dictionary of group ID to cached result, the IDs of the groups that have to be requested,
+        and a dictionary of group ID to the StaleResult of the requested groups that have an expired one.
+        With allow_stale, expired results are part of the cached results as StaleResults. Otherwise their groups are requested too.
+        """
+
+        results = {}
+        missing_ids = []
+        stale_results = {}
+
+        for group_id in group_ids:
+            result, stale = self.cache.lookup(endpoint, self._group_cache_key(endpoint, tournament_id, stage_id, group_id, round_nums))
+
+            if result is not None and (not stale or allow_stale):
+                results[group_id] = StaleResult(result) if stale else result
+                continue
+
+            missing_ids += [group_id]
+
+            if result is not None:
+                stale_results[group_id] = StaleResult(result)
+
+        return results, missing_ids, stale_results
+
+    def _cache_group_results(self, endpoint: str, tournament_id, stage_id, group_ids, round_nums, items):
+        "Splits the ranking items or matches of several groups by group, caches them and returns a dictionary of group ID to result."
+
+        results = self._split_by_group(items, group_ids)
+
+        for group_id, result in results.items():
+            self.cache.put(endpoint, self._group_cache_key(endpoint, tournament_id, stage_id, group_id, round_nums), result)
+
+        return results
+
+    def _stale_fallback(self, results: dict, stale_results: dict, missing_ids):
+        """Completes the results of several groups with the StaleResults of the groups that couldn't be requested.
+        Returns None (and leaves the results unchanged) if one of these groups has no stale result.
+        """
+
+        if any(group_id not in stale_results for group_id in missing_ids):
+            return None
+
+        for group_id in missing_ids:
+            results[group_id] = stale_results[group_id]
+
+        return results
+
+
+class ToornamentAPI(BaseToornamentAPI):
+    """Blocking client for the Toornament API.
+    All viewer and OAuth requests share one pooled keep-alive session, which should be closed with close() (or by using the client as a context manager).
+    """
+
+
+    # Constructor
+    # auth_path: Path to the JSON-file with the Toornament API credentials
+    # pool_size, max_retries, backoff_factor: See BaseToornamentAPI
+    # transport: requests transport adapter that sends the requests instead of the pooled HTTP adapter, e.g. a RecordingAdapter or ReplayAdapter from transport.py
+    # circuit_breaker: See BaseToornamentAPI
+    def __init__(self, auth_path: str, pool_size: int = 10, max_retries: int = 3, backoff_factor: float = 0.5, concurrent_pages: bool = True, rate_limiter: RateLimiter = None, cache: ResponseCache = None, transport = None, circuit_breaker: CircuitBreaker = None):
+        super().__init__(auth_path, pool_size, max_retries, backoff_factor, concurrent_pages, rate_limiter, cache, circuit_breaker)
+        self.__session = self.__create_session(transport)
+        self.__in_flight = SingleFlight()
+
+        self.__revalidating = set()
+        self.__revalidation_lock = threading.Lock()
+
+        self.__token_refresh = SingleFlight()
+        self.__refresh_thread = None
+        self.__refresh_loop = None
+        self.__refresh_lock = threading.Lock()
+        self.__stopped = threading.Event()
+
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def close(self):
+        "Stops the background token refresh and closes the underlying HTTP session and all pooled connections."
+        self.__stopped.set()
+        self.__session.close()
+
+    def __create_session(self, transport = None):
+        """Creates a keep-alive session whose connection pool retries 429 and 5xx responses with exponential backoff.
+        If a transport adapter is given, it's used instead of the pool.
+        """
+
+        session = requests.Session()
+
+        if transport is not None:
+            session.mount("https://", transport)
+            session.mount("http://", transport)
+            return session
+
+        retries = Retry(
+            total = self._max_retries,
+            backoff_factor = self._backoff_factor,
+            status_forcelist = self.retry_statuses,
+            allowed_methods = frozenset(["GET", "POST"]),
+            respect_retry_after_header = True,
+            raise_on_status = False
+        )
+
+        adapter = HTTPAdapter(pool_connections = self._pool_size, pool_maxsize = self._pool_size, max_retries = retries)
+
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
 
     def __check_auth_token(self):
-        "Checks if the Toornament authorization key is up-to-date. Requests and saves a new one if not."
+        """Checks if the Toornament authorization key is up-to-date.
+        Only waits for a new token if the current one has expired. If it expires soon, a new one is requested in the background.
+        """
+
+        if self._tokens.has_expired():
+            self.__token_refresh.do("token", self.__refresh_auth_token)
+        elif self._tokens.needs_refresh():
+            self.__refresh_in_background()
+
+    def __refresh_auth_token(self):
+        "Requests a new authorization token from the OAuth2 endpoint and saves it, unless another thread refreshed it just now."
+
+        if not self._tokens.needs_refresh():
+            return
+
+        request_url, request_data, request_headers = self._token_request()
+        response = self.__request_post(url = request_url, data = request_data, headers = request_headers, authorization=False)
+        self._tokens.update(response)
+
+    def __refresh_in_background(self):
+        "Refreshes the authorization token in a background thread. Requests that need the token in the meantime share this refresh."
+
+        def refresh():
+            try:
+                self.__token_refresh.do("token", self.__refresh_auth_token)
+            except Exception as error:
+                print(f"Couldn't refresh the Toornament authorization token: {error}")
+
+        with self.__refresh_lock:
+            if self.__refresh_thread is None or not self.__refresh_thread.is_alive():
+                self.__refresh_thread = threading.Thread(target = refresh, daemon = True)
+                self.__refresh_thread.start()
+
+    def start_token_refresh(self):
+        "Keeps the authorization token fresh in a background thread until the client is closed, so no request has to wait for a refresh. Does nothing if it's already running."
+
+        def refresh_loop():
+            while not self.__stopped.wait(self._tokens.seconds_until_refresh()):
+                try:
+                    self.__token_refresh.do("token", self.__refresh_auth_token)
+                except Exception as error:
+                    print(f"Couldn't refresh the Toornament authorization token: {error}")
+                    self.__stopped.wait(60)
+
+        with self.__refresh_lock:
+            if self.__refresh_loop is None or not self.__refresh_loop.is_alive():
+                self.__refresh_loop = threading.Thread(target = refresh_loop, daemon = True)
+                self.__refresh_loop.start()
+
+
+    # Waits until the rate limiter allows another request to the scope of the given URL.
+    def __respect_rate_limits(self, url: str):
+        self._rate_limiter.acquire(self._scope(url))
+
+
+    # Sends a request through the pooled session and adapts the rate limiter to the limits reported in the response.
+    # Raises a CircuitOpenError without sending the request while the circuit breaker is open.
+    def __send(self, method: str, url: str, **kwargs):
+        self.circuit_breaker.allow()
+
+        try:
+            with http_seconds.time(method = method):
+                response = self.__session.request(method, url, timeout = self.request_timeout, **kwargs)
+        except BaseException:
+            self.circuit_breaker.record_failure()
+            raise
+
+        self._record_outcome(response.status_code)
+        http_requests.inc(method = method, status = response.status_code)
+        self._rate_limiter.update_from_headers(self._scope(url), response.headers)
+        return response
+
+
+    # Refreshes a stale cache entry in a background thread, unless it's already being refreshed.
+    # If the refresh fails, the error is printed and the stale entry is served until a later refresh succeeds.
+    # cache_key: Endpoint name and key of the cache entry
+    # refresh: Function that requests the response and caches it
+    def __revalidate(self, cache_key, refresh):
+
+        with self.__revalidation_lock:
+            if cache_key in self.__revalidating:
+                return
+
+            self.__revalidating.add(cache_key)
+
+        def revalidate():
+            try:
+                refresh()
+            except Exception as error:
+                print(f"Couldn't refresh the cached {cache_key[0]}: {error}")
+            finally:
+                with self.__revalidation_lock:
+                    self.__revalidating.discard(cache_key)
+
+        threading.Thread(target = revalidate, daemon = True).start()
+
+
+    # Sends a conditional GET request and returns a tuple of the response decoded into the given model and its Content-Range header.
+    # If the API answers with 304 Not Modified, the payload stored from the previous response is returned instead.
+    # headers: The complete request headers including API-token and authorization
+    # model: Model class the JSON response is decoded into, None to keep the JSON
+    def __get_json(self, url: str, headers: dict, model = None):
+        range_header = headers.get('Range')
+        conditional_headers = dict(headers, **self._validators.conditional_headers(url, range_header))
 
-        if self.__has_api_token_expired():
+        # Respects rate limits
+        self.__respect_rate_limits(url)
 
-            # Requests new authorization token from OAuth2 endpoint
-            # See: https://developer.toornament.com/v2/doc/security_oauth2#post:oauthv2token
-            request_url = "https://api.toornament.com/oauth/v2/token"
+        # Sends GET request
+        response = self.__send("GET", url, headers = conditional_headers)
 
-            request_headers = {
-                "Content-Type": "application/x-www-form-urlencoded"
-            }
+        if response.status_code == 304:
+            revalidated = self._validators.revalidated(url, range_header)
 
-            request_data = {
-                "grant_type": "client_credentials",
-                "scope": "organizer:participant organizer:result",
-                "client_id": self.__credentials["client_id"],
-                "client_secret": self.__credentials["client_secret"]
-            }
+            if revalidated is not None:
+                return revalidated
 
-            response = self.__request_post(url = request_url, data = request_data, headers = request_headers, authorization=False)
-            self.__update_api_credentials(response)
+            # The stored payload was dropped in the meantime, so it's requested again without validators
+            self.__respect_rate_limits(url)
+            response = self.__send("GET", url, headers = headers)
+
+        if not response.ok:
+            raise response.raise_for_status()
 
+        # Remembers the validators of the response for the next request
+        payload = decode(fast_json.loads(response.content), model)
+        content_range = response.headers.get('Content-Range')
+        self._validators.update(url, range_header, response.headers, payload, content_range)
 
-    # Checks the time since the last endpoint call and cools down if necessary.
-    # Currently a rate limit of 3 calls/second is used. (This is implemented as a 0.333sec minimum cooldown)
-    def __respect_rate_limits(self):
-        if datetime.datetime.now() < self.__api_cooldown:
-            pause.until(self.__api_cooldown)
-        
-        self.__api_cooldown = datetime.datetime.now() + datetime.timedelta(milliseconds=self.__time_per_request)
+        return payload, content_range
 
 
     # Sends a GET request to a toornament API endpoint. Takes care of authorization&API tokens, rate limits and response validation.
     # url: The API endpoint URL
     # headers: The additional headers to be provided to the API. Authorization and API-Token are added automatically by this method and must not be given to it manually!
     # authorization: If this is True, the method will refresh the OAuth2 authorization token and add it to the request header
-    def __request_get(self, url: str, headers = {}, authorization: bool = False):
+    # model: Model class the JSON response is decoded into, None to keep the JSON
+    def __request_get(self, url: str, headers = {}, authorization: bool = False, model = None):
         # Updates OAuth2 authorization and adds the token to the headers
         if authorization:
             self.__check_auth_token()
-            headers['Authorization'] = self.__credentials["auth_key"]
-        
-        # Adds API-token to header
-        headers['X-Api-Key'] = self.__credentials["token"]
-        
-        # Respects rate limits
-        self.__respect_rate_limits()
 
-        # Sends GET request
-        response = requests.get(url = url, headers = headers)
+        # Identical requests that are already in flight in other threads are awaited instead of being sent again
+        request_key = self._request_key(url, headers, authorization, model)
+
+        # Adds API-token to header
+        headers = self._add_api_headers(headers, authorization)
 
         # Returns response as JSON if it is OK
-        if response.ok:
-            return response.json()
-        else:
-            raise response.raise_for_status()
+        payload, _ = self.__in_flight.do(request_key, lambda: self.__get_json(url, headers, model))
+        return payload
 
 
     # Sends a POST request to a toornament API endpoint. Takes care of authorization&API tokens, rate limits and response validation.
@@ -120,154 +530,652 @@ class ToornamentAPI:
     # headers: The additional headers to be provided to the API. Authorization and API-Token are added automatically by this method and must not be given to it manually!
     # authorization: If this is True, the method will refresh the OAuth2 authorization token and add it to the request header
     def __request_post(self, url: str, data = None, headers = {}, authorization: bool = False):
-        
+
         # Updates OAuth2 authorization and adds the token to the headers
         if authorization:
             self.__check_auth_token()
-            headers['Authorization'] = self.__credentials["auth_key"]
-        
+
         # Adds API-token to header
-        headers['X-Api-Key'] = self.__credentials["token"]
-        
+        headers = self._add_api_headers(headers, authorization)
+
         # Respects rate limits
-        self.__respect_rate_limits()
+        self.__respect_rate_limits(url)
 
         # Sends POST request
-        response = requests.post(url = url, data = data, headers = headers)
+        response = self.__send("POST", url, data = data, headers = headers)
 
         # Returns response as JSON if it is OK
         if response.ok:
-            return response.json()
+            return fast_json.loads(response.content)
         else:
             raise response.raise_for_status()
 
 
-    # Retrieves multiple pages of content via GET-requests and returns them as one result.
+    # Requests a single page of paginated content.
+    # Returns a tuple of the page's content and its parsed Content-Range (None if the page is empty).
+    # headers: The complete request headers including API-token and authorization
+    def __request_page(self, url: str, headers: dict, unit: str, page_start: int, page_end: int, model = None):
+
+        # Adds the range of the page to the header
+        headers = dict(headers)
+        headers['Range'] = f"{unit}={page_start}-{page_end}"
+
+        # Request the page
+        page, content_range = self.__get_json(url, headers, model)
+        pages_fetched.inc(unit = unit)
+        return page, self._parse_content_range(unit, content_range)
+
+
+    # Returns a PageStream over the items of a paginated endpoint, which requests the pages only as the items are consumed.
     # More infos about pagination: https://developer.toornament.com/v2/overview/pagination
     # url: The API endpoint URL
     # headers: The additional headers to be provided to the API. Authorization, API-token and range are added automatically and must not be given manually!
     # authorization: If this is True, the method will refresh the OAuth2 authorization token and add it to the request header
     # unit: The unit in which the paginated content is counted (e.g. tournaments, items, participants, etc)
-    # itemsPerRequest: How many items can be requested per page. Consult toornament API documentation to get the right number for your API endpoint.
-    def __request_get_pages(self, url: str, headers = {}, authorization: bool =  False, unit: str = "items", items_per_request: int = 50):
-    
+    # items_per_request: How many items can be requested per page. Consult toornament API documentation to get the right number for your API endpoint.
+    # limit: Maximum number of items to request, None for all items
+    # prefetch: If True, all pages after the first one are fetched concurrently once the total number of items is known
+    # model: Model class every item is decoded into, None to keep the JSON
+    def __stream_pages(self, url: str, headers = {}, authorization: bool = False, unit: str = "items", items_per_request: int = 50, limit: int = None, prefetch: bool = False, model = None):
+
         # Updates OAuth2 authorization and adds the token to the headers
         if authorization:
             self.__check_auth_token()
-            headers['Authorization'] = self.__credentials["auth_key"]
-        
+
         # Adds API-token to header
-        headers['X-Api-Key'] = self.__credentials["token"]
+        headers = self._add_api_headers(headers, authorization)
 
-        # Defines Content-Range return format used to determine if the last page is reached
-        content_range_format = f"{unit} {{:d}}-{{:d}}/{{:d}}"
-        page_start = 0
-        total_page_num = 1
-        page_list = []
+        fetch_page = lambda page_start, page_end: self.__request_page(url, headers, unit, page_start, page_end, model)
+        return PageStream(fetch_page, items_per_request, limit, prefetch, max_workers = self._pool_size)
 
-        while page_start < total_page_num:
-            # Adds updated range to header
-            page_end = page_start + items_per_request - 1
-            headers['Range'] = f"{unit}={page_start}-{page_end}"
 
-            # Respect rate limit
-            self.__respect_rate_limits()
+    # Retrieves all pages of content (or the first items up to a limit) via GET-requests and returns them as one result.
+    # Once the first page has told the total number of items, the remaining pages are fetched concurrently (unless concurrent_pages is disabled).
+    # If an identical request is already in flight in another thread, its result is awaited instead of requesting the pages again.
+    # The parameters are the same as for __stream_pages.
+    def __request_get_pages(self, url: str, headers = {}, authorization: bool = False, unit: str = "items", items_per_request: int = 50, limit: int = None, model = None):
+        request_key = self._request_key(url, headers, authorization, unit, items_per_request, limit, model)
+        return self.__in_flight.do(request_key, lambda: list(self.__stream_pages(url, headers, authorization, unit, items_per_request, limit, self._concurrent_pages, model)))
 
-            # Request next set of pages
-            response = requests.get(url = url, headers = headers)
 
-            if response.ok:
-                # Adds new pages to the full collection
-                page_list += response.json()
+    # Returns a PageStream over the ranking items of a stage or group, see ToornamentAPI.__stream_pages.
+    # Iterating over it requests the ranking page by page; stopping early (e.g. after the top 10) skips the remaining pages.
+    def stream_ranking(self, tournament_id, stage_id, group_id = "", limit: int = None, prefetch: bool = False):
+        request_url = self._ranking_url(tournament_id, stage_id, group_id)
+        return self.__stream_pages(request_url, limit = limit, prefetch = prefetch, model = RankingItem)
 
-                # Retrieve information on how many pages are left from response headers
-                content_range_str = response.headers['Content-Range']
-                parsed_content_range = parse.parse(content_range_format, content_range_str)
 
-                # If no content is returned, leave the loop
-                if parsed_content_range is None:
-                    break
+    # Returns a PageStream over the matches of a stage or group, see ToornamentAPI.__stream_pages.
+    def stream_matches(self, tournament_id, stage_id, group_id = "", round_nums = [], limit: int = None, prefetch: bool = False):
+        request_url = self._matches_url(tournament_id, stage_id, group_id, round_nums)
+        return self.__stream_pages(request_url, unit = "matches", limit = limit, prefetch = prefetch, model = Match)
 
-                last_page_index = parsed_content_range[1]
-                total_page_num = parsed_content_range[2]
 
-                # Calculates which is the next page to be retrieved
-                page_start = last_page_index + 1
-            else:
-                response.raise_for_status()
+    # Requests the ranking or matches of a stage or group and caches them if they're complete.
+    # endpoint: "ranking" or "matches", see BaseToornamentAPI.group_endpoints
+    def __fetch_for_group(self, endpoint: str, tournament_id, stage_id, group_id, round_nums, limit: int = None):
+        request_url = self._group_url(endpoint, tournament_id, stage_id, [group_id], round_nums)
+        result = self.__request_get_pages(request_url, limit = limit, **self.group_endpoints[endpoint])
+        return self._cache_group_result(endpoint, tournament_id, stage_id, group_id, round_nums, result, limit)
 
-        return page_list
 
-    
+    # Returns the cached ranking or matches of a stage or group, or requests them if they aren't cached.
+    # Expired ones are returned right away as a StaleResult while fresh ones are requested in the background.
+    def __get_for_group(self, endpoint: str, tournament_id, stage_id, group_id, round_nums, limit: int = None):
 
+        cache_key = self._group_cache_key(endpoint, tournament_id, stage_id, group_id, round_nums)
+        result, stale = self.cache.lookup(endpoint, cache_key)
 
+        if result is None:
+            result = self.__fetch_for_group(endpoint, tournament_id, stage_id, group_id, round_nums, limit)
+        elif stale:
+            self.__revalidate((endpoint,) + cache_key, lambda: self.__fetch_for_group(endpoint, tournament_id, stage_id, group_id, round_nums))
 
-    def get_ranking(self, tournament_id, stage_id, group_id = ""):
+        return self._limit_result(result, limit, stale)
 
-        request_url  = f"https://api.toornament.com/viewer/v2/tournaments/{tournament_id}/stages/{stage_id}/ranking-items"
-        request_url += f"?group_ids={group_id}"
 
-        ranking = self.__request_get_pages(request_url)
+    # Requests the ranking or matches of several groups of the same stage with one filtered request and caches them per group.
+    def __fetch_for_groups(self, endpoint: str, tournament_id, stage_id, group_ids, round_nums):
+        request_url = self._group_url(endpoint, tournament_id, stage_id, group_ids, round_nums)
+        items = self.__request_get_pages(request_url, **self.group_endpoints[endpoint])
+        return self._cache_group_results(endpoint, tournament_id, stage_id, group_ids, round_nums, items)
+
+
+    # Returns the ranking or matches of several groups of the same stage as a dictionary of group ID to result.
+    # Groups that aren't cached are requested together with one filtered request. Expired results are returned right away
+    # as StaleResults and requested in the background. Without allow_stale, the groups with expired results are requested right away
+    # too, and the expired results are only returned if that request fails.
+    def __get_for_groups(self, endpoint: str, tournament_id, stage_id, group_ids, round_nums, allow_stale: bool = True):
+
+        results, missing_ids, stale_results = self._lookup_groups(endpoint, tournament_id, stage_id, group_ids, round_nums, allow_stale)
+        stale_ids = [group_id for group_id, result in results.items() if isinstance(result, StaleResult)]
+
+        if stale_ids:
+            self.__revalidate((endpoint, tournament_id, stage_id, tuple(stale_ids), round_nums), lambda: self.__fetch_for_groups(endpoint, tournament_id, stage_id, stale_ids, round_nums))
+
+        if missing_ids:
+            try:
+                results.update(self.__fetch_for_groups(endpoint, tournament_id, stage_id, missing_ids, round_nums))
+            except Exception:
+                if self._stale_fallback(results, stale_results, missing_ids) is None:
+                    raise
+
+        return results
+
+
+    # Returns the ranking of a stage or group. With a limit, only the top items are requested.
+    # Complete rankings are cached, so later calls with or without a limit can be answered from the cache.
+    # An expired ranking is returned right away as a StaleResult while a fresh one is requested in the background.
+    @metrics.timed(endpoint_seconds, endpoint = "get_ranking")
+    def get_ranking(self, tournament_id, stage_id, group_id = "", limit: int = None):
         # ranking = sorted(ranking, key = lambda team: team["position"])[::-1] # This line would sort the ranking in the same order as displayed on Toornament. This seems to be done automatically though.
-        
-        return ranking
+        return self.__get_for_group("ranking", tournament_id, stage_id, group_id, (), limit)
 
 
-    def get_matches(self, tournament_id, stage_id, group_id = "", round_nums = []):
+    # Returns the matches of a stage or group. With a limit, only the first matches are requested.
+    # Complete match lists are cached, so later calls with or without a limit can be answered from the cache.
+    # An expired match list is returned right away as a StaleResult while a fresh one is requested in the background.
+    @metrics.timed(endpoint_seconds, endpoint = "get_matches")
+    def get_matches(self, tournament_id, stage_id, group_id = "", round_nums = [], limit: int = None):
+        return self.__get_for_group("matches", tournament_id, stage_id, group_id, self._round_numbers(round_nums), limit)
 
-        if not isinstance(round_nums, list):
-            round_nums = [round_nums]
 
-        round_nums = [str(round_num) for round_num in round_nums]
+    # Returns the rankings of several groups of the same stage as a dictionary of group ID to ranking, see __get_for_groups.
+    # allow_stale: If False, expired rankings are only returned if they can't be requested, e.g. for polling that needs current data.
+    @metrics.timed(endpoint_seconds, endpoint = "get_rankings_for_groups")
+    def get_rankings_for_groups(self, tournament_id, stage_id, group_ids, allow_stale: bool = True):
+        return self.__get_for_groups("ranking", tournament_id, stage_id, group_ids, (), allow_stale)
 
-        request_url  = f"https://api.toornament.com/viewer/v2/tournaments/{tournament_id}/matches"
-        request_url += f"?stage_ids={stage_id}&group_ids={group_id}&round_numbers={','.join(round_nums)}"
 
-        matches = self.__request_get_pages(request_url, unit="matches")
+    # Returns the matches of several groups of the same stage as a dictionary of group ID to matches, see __get_for_groups.
+    # allow_stale: See get_rankings_for_groups
+    @metrics.timed(endpoint_seconds, endpoint = "get_matches_for_groups")
+    def get_matches_for_groups(self, tournament_id, stage_id, group_ids, round_nums = [], allow_stale: bool = True):
+        return self.__get_for_groups("matches", tournament_id, stage_id, group_ids, self._round_numbers(round_nums), allow_stale)
 
-        return matches
 
-    
+    @metrics.timed(endpoint_seconds, endpoint = "get_groups")
     def get_groups(self, tournament_id):
 
-        request_url = f"https://api.toornament.com/viewer/v2/tournaments/{tournament_id}/groups"
-        groups = self.__request_get_pages(request_url, unit="groups")
+        groups = self.cache.get("groups", tournament_id)
+
+        if groups is None:
+            request_url = self._groups_url(tournament_id)
+            groups = self.__request_get_pages(request_url, unit="groups", model = Group)
+            self.cache.put("groups", tournament_id, groups)
 
         return groups
 
 
+    @metrics.timed(endpoint_seconds, endpoint = "get_stage")
     def get_stage(self, tournament_id, stage_id):
-        
-        request_url = f"https://api.toornament.com/viewer/v2/tournaments/{tournament_id}/stages/{stage_id}"
-        stage = self.__request_get(request_url)
+
+        cache_key = (tournament_id, stage_id)
+        stage = self.cache.get("stage", cache_key)
+
+        if stage is None:
+            request_url = self._stage_url(tournament_id, stage_id)
+            stage = self.__request_get(request_url)
+            self.cache.put("stage", cache_key, stage)
 
         return stage
 
-    
-    def get_tournament(self, tournament_id):
 
-        if tournament_id in self.__tournament_buffer:
-            return self.__tournament_buffer[tournament_id]
+    # Requests a tournament and caches it.
+    def __fetch_tournament(self, tournament_id):
 
-        request_url = f"https://api.toornament.com/viewer/v2/tournaments/{tournament_id}"
-        tournament = self.__request_get(request_url)
+        request_url = self._tournament_url(tournament_id)
+        tournament = self.__request_get(request_url, model = Tournament)
+        self.cache.put("tournament", tournament_id, tournament)
 
-        self.__tournament_buffer[tournament_id] = tournament
+        return tournament
+
+
+    # An expired tournament is returned right away while a fresh one is requested in the background.
+    @metrics.timed(endpoint_seconds, endpoint = "get_tournament")
+    def get_tournament(self, tournament_id):
+
+        tournament, stale = self.cache.lookup("tournament", tournament_id)
+
+        if tournament is None:
+            tournament = self.__fetch_tournament(tournament_id)
+        elif stale:
+            self.__revalidate(("tournament", tournament_id), lambda: self.__fetch_tournament(tournament_id))
 
         return tournament
 
 
+    @metrics.timed(endpoint_seconds, endpoint = "get_group_info")
     def get_group_info(self, tournament_id, group_name):
 
-        if tournament_id in self.__group_buffer:
-            groups = self.__group_buffer[tournament_id]
-        else:
+        groups = self.get_groups(tournament_id)
+        group = self._find_group(tournament_id, groups, group_name)
+
+        # The group might have been created after the groups were cached
+        if group is None:
+            self.cache.invalidate("groups", tournament_id)
             groups = self.get_groups(tournament_id)
-            self.__group_buffer[tournament_id] = groups
+            group = self._find_group(tournament_id, groups, group_name)
 
-        for group in groups:
-            if group["name"] == group_name:
-                group["tournament_id"] = tournament_id
-                return group
+        return group
+
+
+class AsyncToornamentAPI(BaseToornamentAPI):
+    """Asyncio client for the Toornament API with the same endpoint methods as ToornamentAPI.
+    All endpoint methods are coroutines, so waiting for the API or for rate limits doesn't block the event loop.
+    The pooled keep-alive HTTP session is opened on first use and must be closed with close() (or by using the client as an async context manager).
+    """
+
+
+    # Constructor
+    # auth_path: Path to the JSON-file with the Toornament API credentials
+    # pool_size, max_retries, backoff_factor: See BaseToornamentAPI
+    # keepalive: Seconds an idle pooled connection is kept open
+    # transport: Transport that sends the requests through the session instead of the client, e.g. an AsyncRecordingTransport or AsyncReplayTransport from transport.py
+    # circuit_breaker: See BaseToornamentAPI
+    def __init__(self, auth_path: str, pool_size: int = 10, max_retries: int = 3, backoff_factor: float = 0.5, concurrent_pages: bool = True, rate_limiter: RateLimiter = None, cache: ResponseCache = None, keepalive: float = 30.0, transport = None, circuit_breaker: CircuitBreaker = None):
+        super().__init__(auth_path, pool_size, max_retries, backoff_factor, concurrent_pages, rate_limiter, cache, circuit_breaker)
+        self.__keepalive = keepalive
+        self.__transport = transport
+        self.__session = None
+        self.__in_flight = AsyncSingleFlight()
+        self.__revalidations = {}
+
+        self.__token_refresh = AsyncSingleFlight()
+        self.__refresh_task = None
+        self.__refresh_loop = None
+
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.close()
+
+    async def close(self):
+        "Stops the background token refresh and cache revalidations and closes the underlying HTTP session."
+
+        if self.__refresh_loop is not None:
+            self.__refresh_loop.cancel()
+            self.__refresh_loop = None
+
+        for task in list(self.__revalidations.values()):
+            task.cancel()
+
+        if self.__session is not None:
+            await self.__session.close()
+            self.__session = None
+
+    def __get_session(self):
+        "Returns the HTTP session of this client and opens it if necessary. Must be called from within the event loop."
+
+        if self.__session is None or self.__session.closed:
+            connector = aiohttp.TCPConnector(limit = self._pool_size, keepalive_timeout = self.__keepalive)
+            self.__session = aiohttp.ClientSession(connector = connector, timeout = aiohttp.ClientTimeout(total = self.request_timeout))
+
+        return self.__session
+
+    async def __send(self, method: str, url: str, **kwargs):
+        """Sends a request through the pooled session and retries it with exponential backoff on 429 and 5xx responses.
+        Every attempt waits for the rate limiter, which is adapted to the limits reported in the responses.
+        Raises a CircuitOpenError without sending the request while the circuit breaker is open.
+        """
+
+        scope = self._scope(url)
+        attempt = 0
+
+        self.circuit_breaker.allow()
+
+        try:
+            while True:
+                await self._rate_limiter.acquire_async(scope)
+
+                with http_seconds.time(method = method):
+                    if self.__transport is not None:
+                        response = await self.__transport.request(self.__get_session(), method, url, **kwargs)
+                    else:
+                        response = await self.__get_session().request(method, url, **kwargs)
+
+                http_requests.inc(method = method, status = response.status)
+                self._rate_limiter.update_from_headers(scope, response.headers)
+
+                delay = self._retry_delay(attempt, response.status, response.headers)
+
+                if delay is None:
+                    break
+
+                response.release()
+                attempt += 1
+                await asyncio.sleep(delay)
+        except BaseException:
+            self.circuit_breaker.record_failure()
+            raise
+
+        self._record_outcome(response.status)
+        return response
+
+
+    def __revalidate(self, cache_key, refresh):
+        """Refreshes a stale cache entry in a background task, unless it's already being refreshed.
+        If the refresh fails, the error is printed and the stale entry is served until a later refresh succeeds.
+
+        cache_key: Endpoint name and key of the cache entry.
+        refresh:   Coroutine function that requests the response and caches it.
+        """
+
+        if cache_key in self.__revalidations:
+            return
+
+        async def revalidate():
+            try:
+                await refresh()
+            except Exception as error:
+                print(f"Couldn't refresh the cached {cache_key[0]}: {error}")
+
+        task = asyncio.ensure_future(revalidate())
+        self.__revalidations[cache_key] = task
+        task.add_done_callback(lambda _: self.__revalidations.pop(cache_key, None))
+
+
+    async def __check_auth_token(self):
+        """Checks if the Toornament authorization key is up-to-date.
+        Only waits for a new token if the current one has expired. If it expires soon, a new one is requested in the background.
+        """
+
+        if self._tokens.has_expired():
+            await self.__token_refresh.do("token", self.__refresh_auth_token)
+        elif self._tokens.needs_refresh() and (self.__refresh_task is None or self.__refresh_task.done()):
+            self.__refresh_task = asyncio.ensure_future(self.__refresh_in_background())
+
+    async def __refresh_auth_token(self):
+        "Requests a new authorization token from the OAuth2 endpoint and saves it, unless it was refreshed just now."
+
+        if not self._tokens.needs_refresh():
+            return
+
+        request_url, request_data, request_headers = self._token_request()
+        response = await self.__request_post(url = request_url, data = request_data, headers = request_headers, authorization=False)
+        self._tokens.update(response)
+
+    async def __refresh_in_background(self):
+        "Refreshes the authorization token. Requests that need the token in the meantime share this refresh."
+
+        try:
+            await self.__token_refresh.do("token", self.__refresh_auth_token)
+        except Exception as error:
+            print(f"Couldn't refresh the Toornament authorization token: {error}")
+
+    def start_token_refresh(self):
+        "Keeps the authorization token fresh in a background task until the client is closed, so no request has to wait for a refresh. Must be called from within the event loop."
+
+        async def refresh_loop():
+            while True:
+                await asyncio.sleep(self._tokens.seconds_until_refresh())
+
+                try:
+                    await self.__token_refresh.do("token", self.__refresh_auth_token)
+                except Exception as error:
+                    print(f"Couldn't refresh the Toornament authorization token: {error}")
+                    await asyncio.sleep(60)
+
+        if self.__refresh_loop is None:
+            self.__refresh_loop = asyncio.ensure_future(refresh_loop())
+
+
+    # Sends a GET request to a toornament API endpoint. Takes care of authorization&API tokens, rate limits and response validation.
+    # Returns a tuple of the response as JSON and its Content-Range header.
+    # If an identical request is already in flight, its response is awaited instead of sending the request again.
+    # url: The API endpoint URL
+    # headers: The additional headers to be provided to the API. Authorization and API-Token are added automatically by this method and must not be given to it manually!
+    # authorization: If this is True, the method will refresh the OAuth2 authorization token and add it to the request header
+    # model: Model class the JSON response is decoded into, None to keep the JSON
+    async def __request_get(self, url: str, headers = {}, authorization: bool = False, model = None):
+        # Updates OAuth2 authorization and adds the token to the headers
+        if authorization:
+            await self.__check_auth_token()
+
+        request_key = self._request_key(url, headers, authorization, model)
+
+        # Adds API-token to header
+        headers = self._add_api_headers(headers, authorization)
+
+        return await self.__in_flight.do(request_key, lambda: self.__get_json(url, headers, model))
+
+
+    # Sends a conditional GET request and returns a tuple of the response decoded into the given model and its Content-Range header.
+    # If the API answers with 304 Not Modified, the payload stored from the previous response is returned instead.
+    # headers: The complete request headers including API-token and authorization
+    # model: Model class the JSON response is decoded into, None to keep the JSON
+    async def __get_json(self, url: str, headers: dict, model = None):
+        # Adds validators of the previous response to header
+        range_header = headers.get('Range')
+        conditional_headers = dict(headers, **self._validators.conditional_headers(url, range_header))
+
+        # Sends GET request
+        response = await self.__send("GET", url, headers = conditional_headers)
+
+        if response.status == 304:
+            response.release()
+            revalidated = self._validators.revalidated(url, range_header)
+
+            if revalidated is not None:
+                return revalidated
+
+            # The stored payload was dropped in the meantime, so it's requested again without validators
+            response = await self.__send("GET", url, headers = headers)
+
+        # Returns response as JSON if it is OK and remembers its validators for the next request
+        async with response:
+            response.raise_for_status()
+            payload = decode(fast_json.loads(await response.read()), model)
+
+        content_range = response.headers.get('Content-Range')
+        self._validators.update(url, range_header, response.headers, payload, content_range)
+
+        return payload, content_range
+
+
+    # Sends a POST request to a toornament API endpoint. Takes care of authorization&API tokens, rate limits and response validation.
+    # url: The API endpoint URL
+    # data: The data to be sent with the request
+    # headers: The additional headers to be provided to the API. Authorization and API-Token are added automatically by this method and must not be given to it manually!
+    # authorization: If this is True, the method will refresh the OAuth2 authorization token and add it to the request header
+    async def __request_post(self, url: str, data = None, headers = {}, authorization: bool = False):
+        # Updates OAuth2 authorization and adds the token to the headers
+        if authorization:
+            await self.__check_auth_token()
+
+        # Adds API-token to header
+        headers = self._add_api_headers(headers, authorization)
+
+        # Sends POST request and returns the response as JSON if it is OK
+        async with await self.__send("POST", url, data = data, headers = headers) as response:
+            response.raise_for_status()
+            return fast_json.loads(await response.read())
+
+
+    # Requests a single page of paginated content.
+    # Returns a tuple of the page's content and its parsed Content-Range (None if the page is empty).
+    async def __request_page(self, url: str, headers: dict, authorization: bool, unit: str, page_start: int, page_end: int, model = None):
+
+        # Adds the range of the page to the header
+        headers = dict(headers)
+        headers['Range'] = f"{unit}={page_start}-{page_end}"
+
+        page, content_range = await self.__request_get(url, headers, authorization, model)
+        pages_fetched.inc(unit = unit)
+        return page, self._parse_content_range(unit, content_range)
+
+
+    # Returns an AsyncPageStream over the items of a paginated endpoint, which requests the pages only as the items are consumed.
+    # The parameters are the same as for ToornamentAPI.__stream_pages.
+    def __stream_pages(self, url: str, headers = {}, authorization: bool = False, unit: str = "items", items_per_request: int = 50, limit: int = None, prefetch: bool = False, model = None):
+        fetch_page = lambda page_start, page_end: self.__request_page(url, headers, authorization, unit, page_start, page_end, model)
+        return AsyncPageStream(fetch_page, items_per_request, limit, prefetch)
+
+
+    # Retrieves all pages of content (or the first items up to a limit) via GET-requests and returns them as one result.
+    # Once the first page has told the total number of items, the remaining pages are fetched concurrently (unless concurrent_pages is disabled).
+    # If an identical request is already in flight, its result is awaited instead of requesting the pages again.
+    async def __request_get_pages(self, url: str, headers = {}, authorization: bool = False, unit: str = "items", items_per_request: int = 50, limit: int = None, model = None):
+        request_key = self._request_key(url, headers, authorization, unit, items_per_request, limit, model)
+        return await self.__in_flight.do(request_key, lambda: self.__stream_pages(url, headers, authorization, unit, items_per_request, limit, self._concurrent_pages, model).to_list())
+
+
+    # Returns an AsyncPageStream over the ranking items of a stage or group, to be used with 'async for'.
+    # Iterating over it requests the ranking page by page; stopping early (e.g. after the top 10) skips the remaining pages.
+    def stream_ranking(self, tournament_id, stage_id, group_id = "", limit: int = None, prefetch: bool = False):
+        request_url = self._ranking_url(tournament_id, stage_id, group_id)
+        return self.__stream_pages(request_url, limit = limit, prefetch = prefetch, model = RankingItem)
+
+
+    # Returns an AsyncPageStream over the matches of a stage or group, to be used with 'async for'.
+    def stream_matches(self, tournament_id, stage_id, group_id = "", round_nums = [], limit: int = None, prefetch: bool = False):
+        request_url = self._matches_url(tournament_id, stage_id, group_id, round_nums)
+        return self.__stream_pages(request_url, unit = "matches", limit = limit, prefetch = prefetch, model = Match)
+
+
+    # Requests the ranking or matches of a stage or group and caches them if they're complete.
+    # endpoint: "ranking" or "matches", see BaseToornamentAPI.group_endpoints
+    async def __fetch_for_group(self, endpoint: str, tournament_id, stage_id, group_id, round_nums, limit: int = None):
+        request_url = self._group_url(endpoint, tournament_id, stage_id, [group_id], round_nums)
+        result = await self.__request_get_pages(request_url, limit = limit, **self.group_endpoints[endpoint])
+        return self._cache_group_result(endpoint, tournament_id, stage_id, group_id, round_nums, result, limit)
+
+
+    # Returns the cached ranking or matches of a stage or group, or requests them if they aren't cached.
+    # Expired ones are returned right away as a StaleResult while fresh ones are requested in the background.
+    async def __get_for_group(self, endpoint: str, tournament_id, stage_id, group_id, round_nums, limit: int = None):
+
+        cache_key = self._group_cache_key(endpoint, tournament_id, stage_id, group_id, round_nums)
+        result, stale = self.cache.lookup(endpoint, cache_key)
+
+        if result is None:
+            result = await self.__fetch_for_group(endpoint, tournament_id, stage_id, group_id, round_nums, limit)
+        elif stale:
+            self.__revalidate((endpoint,) + cache_key, lambda: self.__fetch_for_group(endpoint, tournament_id, stage_id, group_id, round_nums))
+
+        return self._limit_result(result, limit, stale)
+
+
+    # Requests the ranking or matches of several groups of the same stage with one filtered request and caches them per group.
+    async def __fetch_for_groups(self, endpoint: str, tournament_id, stage_id, group_ids, round_nums):
+        request_url = self._group_url(endpoint, tournament_id, stage_id, group_ids, round_nums)
+        items = await self.__request_get_pages(request_url, **self.group_endpoints[endpoint])
+        return self._cache_group_results(endpoint, tournament_id, stage_id, group_ids, round_nums, items)
+
+
+    # Returns the ranking or matches of several groups of the same stage as a dictionary of group ID to result.
+    # Groups that aren't cached are requested together with one filtered request. Expired results are returned right away
+    # as StaleResults and requested in the background. Without allow_stale, the groups with expired results are requested right away
+    # too, and the expired results are only returned if that request fails.
+    async def __get_for_groups(self, endpoint: str, tournament_id, stage_id, group_ids, round_nums, allow_stale: bool = True):
+
+        results, missing_ids, stale_results = self._lookup_groups(endpoint, tournament_id, stage_id, group_ids, round_nums, allow_stale)
+        stale_ids = [group_id for group_id, result in results.items() if isinstance(result, StaleResult)]
+
+        if stale_ids:
+            self.__revalidate((endpoint, tournament_id, stage_id, tuple(stale_ids), round_nums), lambda: self.__fetch_for_groups(endpoint, tournament_id, stage_id, stale_ids, round_nums))
+
+        if missing_ids:
+            try:
+                results.update(await self.__fetch_for_groups(endpoint, tournament_id, stage_id, missing_ids, round_nums))
+            except Exception:
+                if self._stale_fallback(results, stale_results, missing_ids) is None:
+                    raise
+
+        return results
+
+
+    # Returns the ranking of a stage or group. With a limit, only the top items are requested.
+    # Complete rankings are cached, so later calls with or without a limit can be answered from the cache.
+    # An expired ranking is returned right away as a StaleResult while a fresh one is requested in the background.
+    @metrics.timed(endpoint_seconds, endpoint = "get_ranking")
+    async def get_ranking(self, tournament_id, stage_id, group_id = "", limit: int = None):
+        return await self.__get_for_group("ranking", tournament_id, stage_id, group_id, (), limit)
+
+
+    # Returns the matches of a stage or group. With a limit, only the first matches are requested.
+    # Complete match lists are cached, so later calls with or without a limit can be answered from the cache.
+    # An expired match list is returned right away as a StaleResult while a fresh one is requested in the background.
+    @metrics.timed(endpoint_seconds, endpoint = "get_matches")
+    async def get_matches(self, tournament_id, stage_id, group_id = "", round_nums = [], limit: int = None):
+        return await self.__get_for_group("matches", tournament_id, stage_id, group_id, self._round_numbers(round_nums), limit)
+
+
+    # Returns the rankings of several groups of the same stage as a dictionary of group ID to ranking, see __get_for_groups.
+    # allow_stale: If False, expired rankings are only returned if they can't be requested, e.g. for polling that needs current data.
+    @metrics.timed(endpoint_seconds, endpoint = "get_rankings_for_groups")
+    async def get_rankings_for_groups(self, tournament_id, stage_id, group_ids, allow_stale: bool = True):
+        return await self.__get_for_groups("ranking", tournament_id, stage_id, group_ids, (), allow_stale)
+
+
+    # Returns the matches of several groups of the same stage as a dictionary of group ID to matches, see __get_for_groups.
+    # allow_stale: See get_rankings_for_groups
+    @metrics.timed(endpoint_seconds, endpoint = "get_matches_for_groups")
+    async def get_matches_for_groups(self, tournament_id, stage_id, group_ids, round_nums = [], allow_stale: bool = True):
+        return await self.__get_for_groups("matches", tournament_id, stage_id, group_ids, self._round_numbers(round_nums), allow_stale)
+
+
+    @metrics.timed(endpoint_seconds, endpoint = "get_groups")
+    async def get_groups(self, tournament_id):
+
+        groups = self.cache.get("groups", tournament_id)
+
+        if groups is None:
+            request_url = self._groups_url(tournament_id)
+            groups = await self.__request_get_pages(request_url, unit="groups", model = Group)
+            self.cache.put("groups", tournament_id, groups)
+
+        return groups
+
+
+    @metrics.timed(endpoint_seconds, endpoint = "get_stage")
+    async def get_stage(self, tournament_id, stage_id):
+
+        cache_key = (tournament_id, stage_id)
+        stage = self.cache.get("stage", cache_key)
+
+        if stage is None:
+            request_url = self._stage_url(tournament_id, stage_id)
+            stage, _ = await self.__request_get(request_url)
+            self.cache.put("stage", cache_key, stage)
+
+        return stage
+
+
+    async def __fetch_tournament(self, tournament_id):
+
+        request_url = self._tournament_url(tournament_id)
+        tournament, _ = await self.__request_get(request_url, model = Tournament)
+        self.cache.put("tournament", tournament_id, tournament)
+
+        return tournament
+
+
+    @metrics.timed(endpoint_seconds, endpoint = "get_tournament")
+    async def get_tournament(self, tournament_id):
+
+        tournament, stale = self.cache.lookup("tournament", tournament_id)
+
+        if tournament is None:
+            tournament = await self.__fetch_tournament(tournament_id)
+        elif stale:
+            self.__revalidate(("tournament", tournament_id), lambda: self.__fetch_tournament(tournament_id))
+
+        return tournament
+
+
+    @metrics.timed(endpoint_seconds, endpoint = "get_group_info")
+    async def get_group_info(self, tournament_id, group_name):
+
+        groups = await self.get_groups(tournament_id)
+        group = self._find_group(tournament_id, groups, group_name)
+
+        # The group might have been created after the groups were cached
+        if group is None:
+            self.cache.invalidate("groups", tournament_id)
+            groups = await self.get_groups(tournament_id)
+            group = self._find_group(tournament_id, groups, group_name)
 
-        return None
\ No newline at end of file
+        return group
@@ -0,0 +1,180 @@
+import hashlib
+import os
+
+import aiohttp
+import fast_json
+import requests
+from multidict import CIMultiDict, CIMultiDictProxy
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from yarl import URL
+
+# Transports that record the responses of the Toornament API as fixture files and answer requests with them later,
+# so the clients can be used without credentials or network access.
+# RecordingAdapter and ReplayAdapter replace the pooled HTTP adapter of ToornamentAPI,
+# AsyncRecordingTransport and AsyncReplayTransport send the requests of AsyncToornamentAPI.
+# Both kinds use the same fixture files, so responses recorded with one client can be replayed with the other.
+
+def fixture_name(method: str, url: str, range_header: str = None):
+    "Returns the file name of the fixture of a request. Requests are told apart by method, URL and requested page."
+
+    request_id = f"{method.upper()} {url} {range_header or ''}"
+    return hashlib.sha1(request_id.encode('utf-8')).hexdigest() + ".json"
+
+
+def save_fixture(fixture_dir: str, method: str, url: str, range_header: str, status: int, headers: dict, body: str):
+    """Writes the response to a request to its fixture file.
+    Access tokens received from the OAuth endpoint are replaced, so recorded fixtures never contain credentials.
+    """
+
+    if "/oauth/" in url and status < 400:
+        body = fast_json.dumps(dict(fast_json.loads(body), access_token = "recorded"))
+
+    fixture = {
+        "method": method,
+        "url": url,
+        "range": range_header,
+        "status": status,
+        "headers": {str(name): value for name, value in headers.items()},
+        "body": body
+    }
+
+    fixture_path = os.path.join(fixture_dir, fixture_name(method, url, range_header))
+
+    with open(fixture_path, 'w', encoding='utf-8') as fixture_file:
+        fixture_file.write(fast_json.dumps(fixture))
+
+
+def load_fixture(fixture_dir: str, method: str, url: str, range_header: str = None):
+    "Returns the recorded response to a request, or None if there is none."
+
+    fixture_path = os.path.join(fixture_dir, fixture_name(method, url, range_header))
+
+    try:
+        with open(fixture_path, 'rb') as fixture_file:
+            fixture = fast_json.loads(fixture_file.read())
+    except FileNotFoundError:
+        return None
+
+    # The body is stored decoded, so the original transfer encoding doesn't apply anymore
+    headers = {name: value for name, value in fixture["headers"].items() if name.lower() not in ("content-encoding", "transfer-encoding")}
+    return dict(fixture, headers = headers)
+
+
+class RecordingAdapter(HTTPAdapter):
+    """HTTP adapter that saves every response it receives as a fixture for ReplayAdapter.
+    Responses to conditional requests (304 Not Modified) aren't saved, as they have no body.
+    """
+
+    def __init__(self, fixture_dir: str, **kwargs):
+        """fixture_dir: Directory the fixture files are written to.
+        kwargs:      Passed on to HTTPAdapter (e.g. pool sizes and max_retries).
+        """
+        super().__init__(**kwargs)
+
+        self.fixture_dir = fixture_dir
+        os.makedirs(fixture_dir, exist_ok = True)
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+
+        if response.status_code != 304:
+            save_fixture(self.fixture_dir, request.method, request.url, request.headers.get('Range'), response.status_code, dict(response.headers), response.text)
+
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """Adapter that answers requests with the fixtures saved by RecordingAdapter instead of sending them.
+    Requests without a fixture fail with a ConnectionError, as they would without network access.
+    """
+
+    def __init__(self, fixture_dir: str):
+        "fixture_dir: Directory with the recorded fixture files."
+        super().__init__()
+        self.fixture_dir = fixture_dir
+
+    def send(self, request, **kwargs):
+        fixture = load_fixture(self.fixture_dir, request.method, request.url, request.headers.get('Range'))
+
+        if fixture is None:
+            raise requests.exceptions.ConnectionError(f"No recorded response for {request.method} {request.url}", request = request)
+
+        response = requests.Response()
+        response.status_code = fixture["status"]
+        response.headers = CaseInsensitiveDict(fixture["headers"])
+        response._content = fixture["body"].encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class AsyncRecordingTransport:
+    """Transport for AsyncToornamentAPI that sends the requests through its session and saves every response as a fixture.
+    Responses to conditional requests (304 Not Modified) aren't saved, as they have no body.
+    """
+
+    def __init__(self, fixture_dir: str):
+        "fixture_dir: Directory the fixture files are written to."
+        self.fixture_dir = fixture_dir
+        os.makedirs(fixture_dir, exist_ok = True)
+
+    async def request(self, session: aiohttp.ClientSession, method: str, url: str, **kwargs):
+        response = await session.request(method, url, **kwargs)
+
+        # The body is kept by the response after reading it, so the client can still read it
+        if response.status != 304:
+            body = (await response.read()).decode('utf-8')
+            save_fixture(self.fixture_dir, method, url, kwargs.get('headers', {}).get('Range'), response.status, dict(response.headers), body)
+
+        return response
+
+
+class AsyncReplayTransport:
+    """Transport for AsyncToornamentAPI that answers requests with the recorded fixtures instead of sending them.
+    Requests without a fixture fail with a ClientConnectionError, as they would without network access.
+    """
+
+    def __init__(self, fixture_dir: str):
+        "fixture_dir: Directory with the recorded fixture files."
+        self.fixture_dir = fixture_dir
+
+    async def request(self, session: aiohttp.ClientSession, method: str, url: str, **kwargs):
+        fixture = load_fixture(self.fixture_dir, method, url, kwargs.get('headers', {}).get('Range'))
+
+        if fixture is None:
+            raise aiohttp.ClientConnectionError(f"No recorded response for {method} {url}")
+
+        return ReplayResponse(method, url, fixture)
+
+
+class ReplayResponse:
+    "Recorded response returned by AsyncReplayTransport, with the parts of aiohttp.ClientResponse that AsyncToornamentAPI uses."
+
+    def __init__(self, method: str, url: str, fixture: dict):
+        self.method = method
+        self.url = URL(url)
+        self.status = fixture["status"]
+        self.headers = CIMultiDictProxy(CIMultiDict(fixture["headers"]))
+        self.__body = fixture["body"].encode('utf-8')
+
+    async def read(self):
+        return self.__body
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            request_info = aiohttp.RequestInfo(self.url, self.method, CIMultiDictProxy(CIMultiDict()), self.url)
+            raise aiohttp.ClientResponseError(request_info, (), status = self.status, message = "Recorded error response", headers = self.headers)
+
+    def release(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        self.release()